@@ -0,0 +1,305 @@
+import hashlib
+import time
+from array import array
+from collections import namedtuple
+from itertools import chain
+
+from django.core.cache import cache
+from django.db.models import CharField, Prefetch, Value
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscribe
+)
+
+from .metrics import collect, observe_cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_CARD_KEY = 'recipe:card:{}'
+RECIPE_CARD_TIMEOUT = 60 * 60 * 24
+USER_RELATIONS_GENERATION_KEY = 'user:{}:relations'
+USER_RELATIONS_KEY = 'user:{}:{}:{}'
+USER_RELATIONS_TIMEOUT = 60 * 60
+RECIPE_INGREDIENTS_VERSION_KEY = 'recipe_ingredients:version'
+RECIPE_INGREDIENTS_CHANGE_KEY = 'recipe_ingredients:change:{}'
+RECIPE_INGREDIENTS_CHANGE_TIMEOUT = 60 * 60 * 24
+
+USER_RELATIONS = {
+    'favourites': (Favourite, 'recipe_id'),
+    'cart': (ShoppingCart, 'recipe_id'),
+    'following': (Subscribe, 'author_id'),
+}
+
+UserRelations = namedtuple('UserRelations', USER_RELATIONS)
+EMPTY_RELATIONS = UserRelations(frozenset(), frozenset(), frozenset())
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def get_recipe_ingredients_version():
+    version = cache.get(RECIPE_INGREDIENTS_VERSION_KEY)
+    if version is None:
+        cache.add(RECIPE_INGREDIENTS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(RECIPE_INGREDIENTS_VERSION_KEY)
+    return version
+
+
+def record_recipe_changes(recipe_ids):
+    """Каждое изменение составов получает свой номер версии.
+
+    По номерам процессы догружают только изменённые рецепты, см.
+    get_recipe_changes.
+    """
+    try:
+        version = cache.incr(RECIPE_INGREDIENTS_VERSION_KEY)
+    except ValueError:
+        cache.set(RECIPE_INGREDIENTS_VERSION_KEY, time.time_ns(), None)
+        return
+    cache.set(
+        RECIPE_INGREDIENTS_CHANGE_KEY.format(version),
+        list(recipe_ids),
+        RECIPE_INGREDIENTS_CHANGE_TIMEOUT
+    )
+
+
+def reset_recipe_ingredients_version():
+    cache.set(RECIPE_INGREDIENTS_VERSION_KEY, time.time_ns(), None)
+
+
+def get_recipe_changes(since, until):
+    """Рецепты, изменённые между версиями, или None, если журнал неполон."""
+    keys = [
+        RECIPE_INGREDIENTS_CHANGE_KEY.format(version)
+        for version in range(since + 1, until + 1)
+    ]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return None
+    return set(chain.from_iterable(changes.values()))
+
+
+def get_catalog_stats():
+    """Попадания и промахи кэша каталога во всех процессах."""
+    stats = collect()['caches'].get('catalog', {})
+    return stats.get('hits', 0), stats.get('misses', 0)
+
+
+class CatalogCacheMixin:
+
+    def get_cache_key(self, request):
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f'catalog:{get_catalog_version()}:{self.basename}:{path}'
+
+    def cached_response(self, method, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            observe_cache('catalog', hit=False)
+            response = method(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = JSONRenderer().render(response.data)
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+            cache.set(key, (etag, content), CATALOG_CACHE_TIMEOUT)
+            cache_status = 'MISS'
+        else:
+            observe_cache('catalog', hit=True)
+            etag, content = cached
+            cache_status = 'HIT'
+        if etag in (
+            tag.strip().replace('W/', '', 1) for tag in
+            request.headers.get('If-None-Match', '').split(',')
+        ):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['X-Cache'] = cache_status
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+def get_recipe_card_key(recipe_id):
+    return RECIPE_CARD_KEY.format(recipe_id)
+
+
+def delete_recipe_cards(recipe_ids):
+    cache.delete_many([
+        get_recipe_card_key(recipe_id) for recipe_id in recipe_ids
+    ])
+
+
+def get_user_relations_generation(user_id):
+    key = USER_RELATIONS_GENERATION_KEY.format(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_user_relations_generation(user_id):
+    key = USER_RELATIONS_GENERATION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def load_user_relations(user_id):
+    """Связи пользователя из кэша, недостающие — одним запросом из БД.
+
+    Ключи содержат поколение связей пользователя: если изменение
+    закоммитили, пока множества читались из БД, они запишутся под
+    устаревшим ключом и читаться уже не будут.
+    """
+    generation = get_user_relations_generation(user_id)
+    keys = {
+        name: USER_RELATIONS_KEY.format(user_id, generation, name)
+        for name in UserRelations._fields
+    }
+    cached = cache.get_many(keys.values())
+    relations = {}
+    for name, key in keys.items():
+        observe_cache('user_relations', hit=key in cached)
+        if key in cached:
+            relations[name] = frozenset(cached[key])
+    missing = [name for name in keys if name not in relations]
+    if missing:
+        querysets = [
+            model.objects.filter(user_id=user_id).order_by().annotate(
+                kind=Value(name, output_field=CharField())
+            ).values_list('kind', field)
+            for name, (model, field) in USER_RELATIONS.items()
+            if name in missing
+        ]
+        rows = querysets[0]
+        if len(querysets) > 1:
+            rows = rows.union(*querysets[1:], all=True)
+        loaded = {name: set() for name in missing}
+        for name, related_id in rows:
+            loaded[name].add(related_id)
+        cache.set_many({
+            keys[name]: array('q', sorted(ids))
+            for name, ids in loaded.items()
+        }, USER_RELATIONS_TIMEOUT)
+        relations.update(
+            (name, frozenset(ids)) for name, ids in loaded.items()
+        )
+    return UserRelations(**relations)
+
+
+def get_user_relations(request):
+    if request is None or not request.user.is_authenticated:
+        return EMPTY_RELATIONS
+    relations = getattr(request, 'user_relations', None)
+    if relations is None:
+        relations = request.user_relations = load_user_relations(
+            request.user.pk
+        )
+    return relations
+
+
+def build_absolute_urls(card, request):
+    for field in ('image', 'image_thumb'):
+        if card.get(field):
+            card[field] = request.build_absolute_uri(card[field])
+    if card.get('image_srcset'):
+        card['image_srcset'] = ', '.join(
+            f'{request.build_absolute_uri(url)} {width}'
+            for url, width in (
+                item.rsplit(' ', 1) for item in card['image_srcset'].split(
+                    ', '
+                )
+            )
+        )
+    return card
+
+
+class RecipeCardCacheMixin:
+    """Кэш не зависящей от пользователя части карточки рецепта.
+
+    Флаги избранного, корзины и подписки берутся из множеств связей
+    пользователя, см. get_user_relations.
+    """
+
+    def get_cards(self, recipes):
+        keys = {
+            recipe.pk: get_recipe_card_key(recipe.pk) for recipe in recipes
+        }
+        cards = cache.get_many(keys.values())
+        missing = [pk for pk, key in keys.items() if key not in cards]
+        for key in keys.values():
+            observe_cache('recipe_card', hit=key in cards)
+        if missing:
+            fresh = {
+                keys[card['id']]: card
+                for card in self.get_serializer(
+                    Recipe.objects.filter(pk__in=missing).prefetch_related(
+                        'tags',
+                        'author',
+                        Prefetch(
+                            'recipe_ingredients',
+                            queryset=RecipeIngredient.objects.select_related(
+                                'ingredient'
+                            )
+                        ),
+                    ),
+                    many=True,
+                    context={}
+                ).data
+            }
+            cache.set_many(fresh, RECIPE_CARD_TIMEOUT)
+            cards.update(fresh)
+        relations = get_user_relations(self.request)
+        return [
+            build_absolute_urls(dict(
+                cards[keys[recipe.pk]],
+                is_favorited=recipe.pk in relations.favourites,
+                is_in_shopping_cart=recipe.pk in relations.cart,
+                favorites_count=recipe.favorites_count,
+                author=dict(
+                    cards[keys[recipe.pk]]['author'],
+                    is_subscribed=recipe.author_id in relations.following
+                ),
+            ), self.request)
+            for recipe in recipes
+        ]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_cards(list(queryset)))
+        return self.get_paginated_response(self.get_cards(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_cards([self.get_object()])[0])
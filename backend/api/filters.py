@@ -1,15 +1,35 @@
+from django.db.models import Case, IntegerField, When
 from django_filters import rest_framework as filters
 
+from api.search import ingredient_index
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import filter_by_ingredients, search_recipes
+
+# Сортировки списка рецептов; каждой соответствует индекс в Recipe.Meta.
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending', '-id'),
+    'cooking_time': ('cooking_time', '-id'),
+}
 
 
 class IngredientSearchFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
+    name = filters.CharFilter(method='get_name')
 
     class Meta:
         model = Ingredient
         fields = ('name', )
 
+    def get_name(self, queryset, name, value):
+        ingredient_index.refresh()
+        ids = ingredient_index.search(value)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+            output_field=IntegerField()
+        ))
+
 
 class RecipeFilter(filters.FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
@@ -17,6 +37,15 @@ class RecipeFilter(filters.FilterSet):
         field_name='tags__slug',
         to_field_name='slug',
     )
+    ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='get_ingredients'
+    )
+    search = filters.CharFilter(method='get_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='get_ordering'
+    )
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
@@ -24,7 +53,23 @@ class RecipeFilter(filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'ingredients', 'search', 'ordering',
+            'is_favorited', 'is_in_shopping_cart'
+        )
+
+    def get_ingredients(self, queryset, name, value):
+        if value:
+            return filter_by_ingredients(
+                queryset, (ingredient.pk for ingredient in value)
+            )
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if value:
@@ -0,0 +1,114 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from api.management.commands.load_test import PERCENTILES, percentile
+from api.search import CookIndex
+from recipes.models import RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение подбора рецептов по набору продуктов через индекс '
+        'в памяти с агрегирующим запросом к базе данных. Данные нужно '
+        'заранее сгенерировать, например: seed_benchmark --recipes 100000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument(
+            '--sql-queries', type=int, default=5,
+            help='Сколько наборов продуктов проверить запросом к базе'
+        )
+        parser.add_argument(
+            '--size', type=int, default=8,
+            help='Число продуктов в наборе'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--changes', type=int, default=100,
+            help='Сколько рецептов догрузить при инкрементальном обновлении'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        index = CookIndex()
+        start = time.perf_counter()
+        index.build(index.load())
+        build = time.perf_counter() - start
+        if not index.recipes:
+            raise CommandError(
+                'Нет рецептов с продуктами, сгенерируйте данные командой '
+                'seed_benchmark'
+            )
+        self.stdout.write(
+            f'{len(index.recipes)} рецептов, {len(index.postings)} продуктов, '
+            f'построение индекса {build * 1000:.1f} ms'
+        )
+
+        changed = generator.sample(
+            list(index.recipes), min(options['changes'], len(index.recipes))
+        )
+        start = time.perf_counter()
+        index.apply(changed)
+        self.stdout.write(
+            f'инкрементальное обновление {len(changed)} рецептов: '
+            f'{(time.perf_counter() - start) * 1000:.1f} ms'
+        )
+
+        ingredients = list(index.postings)
+        weights = [len(index.postings[pk]) for pk in ingredients]
+        queries = [
+            set(generator.choices(ingredients, weights, k=options['size']))
+            for _ in range(options['queries'])
+        ]
+        self.report('index', queries, lambda query: index.match(
+            query, options['limit']
+        ))
+        self.report(
+            'sql', queries[:options['sql_queries']],
+            lambda query: self.match_sql(query, options['limit'])
+        )
+        mismatches = sum(
+            self.match_sql(query, options['limit'])
+            != [recipe_id for recipe_id, _, _ in index.match(
+                query, options['limit']
+            )]
+            for query in queries[:options['sql_queries']]
+        )
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'Результаты индекса и запроса расходятся: {mismatches}'
+            ))
+
+    def match_sql(self, query, limit):
+        return list(RecipeIngredient.objects.values('recipe_id').annotate(
+            total=Count('ingredient_id', distinct=True),
+            found=Count(
+                'ingredient_id',
+                filter=Q(ingredient_id__in=query),
+                distinct=True
+            ),
+        ).filter(found__gt=0).annotate(
+            coverage=Cast('found', FloatField()) / F('total')
+        ).order_by(
+            '-coverage', '-found', '-recipe_id'
+        ).values_list('recipe_id', flat=True)[:limit])
+
+    def report(self, name, queries, match):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            match(query)
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{name}: {len(queries)} запросов, '
+            + ', '.join(
+                f'p{percent} {percentile(timings, percent) * 1000:.2f} ms'
+                for percent in PERCENTILES
+            )
+        )
@@ -0,0 +1,72 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+
+from api.search import IngredientIndex
+from foodgram_backend.settings import IMPORT_FILES_DIR
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Сравнение поиска ингредиентов по индексу в памяти '
+            'с запросом istartswith к базе данных. Запросы выполняются '
+            'во временной тестовой базе, рабочие таблицы не затрагиваются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with open(
+            f'{IMPORT_FILES_DIR}/ingredients.csv', encoding='utf-8'
+        ) as file:
+            rows = [row for row in csv.reader(file) if row]
+        queries = sorted({
+            row[0][:length].lower() for row in rows for length in (1, 2, 3)
+        })
+        start = time.perf_counter()
+        index = IngredientIndex()
+        index.build(
+            (pk, name) for pk, (name, _) in enumerate(rows, start=1)
+        )
+        build = time.perf_counter() - start
+        self.report(
+            'index prefix', queries, options['repeat'],
+            lambda query: index.search(query, contains=False)
+        )
+        self.report(
+            'index prefix+contains', queries, options['repeat'],
+            index.search
+        )
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={'default'}
+        )
+        try:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in rows
+            )
+            self.report(
+                'orm istartswith', queries, options['repeat'],
+                lambda query: list(Ingredient.objects.filter(
+                    name__istartswith=query
+                ).values_list('id', flat=True))
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+        self.stdout.write(
+            f'{len(rows)} ингредиентов, {len(queries)} запросов, '
+            f'построение индекса {build * 1000:.1f} ms'
+        )
+
+    def report(self, name, queries, repeat, search):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{name}: {elapsed / (repeat * len(queries)) * 1e6:.1f} '
+            f'µs на запрос'
+        )
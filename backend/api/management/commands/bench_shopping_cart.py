@@ -0,0 +1,113 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.renderers import shopping_list_lines
+from api.views import RecipeViewSet
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    User
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнение потоковой выгрузки списка покупок '
+            'с формированием файла целиком в памяти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument(
+            '--format', default='txt', choices=('txt', 'csv', 'pdf')
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['recipes'], options['ingredients'])
+            self.report('materialised', self.materialised, user)
+            self.report(
+                f'streaming ({options["format"]})',
+                self.streaming, user, options['format']
+            )
+            transaction.set_rollback(True)
+
+    def seed(self, recipes_count, ingredients_count):
+        user = User.objects.create(
+            email='bench@foodgram.local', username='bench_shopping_cart'
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench ingredient {index}', measurement_unit='г')
+            for index in range(recipes_count * ingredients_count // 2 + 1)
+        )
+        ingredients = list(
+            Ingredient.objects.filter(name__startswith='bench ingredient')
+        )
+        Recipe.objects.bulk_create(
+            Recipe(author=user, name=f'bench recipe {index}',
+                   text='bench', cooking_time=1)
+            for index in range(recipes_count)
+        )
+        recipes = list(Recipe.objects.filter(author=user))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (index * ingredients_count + offset) % len(ingredients)
+                ],
+                amount=offset + 1
+            )
+            for index, recipe in enumerate(recipes)
+            for offset in range(ingredients_count)
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for recipe in recipes
+        )
+        return user
+
+    def materialised(self, user):
+        class Request:
+            pass
+        request = Request()
+        request.user = user
+        ingredients = list(
+            RecipeIngredient.ingredients_shopping_cart(None, request=request)
+        )
+        recipes = list(ShoppingCart.objects.filter(user=user).values_list(
+            'recipe__name', flat=True
+        ).order_by('recipe__name').distinct())
+        yield '\n'.join(shopping_list_lines(ingredients, recipes)).encode()
+
+    def streaming(self, user, format='txt'):
+        request = APIRequestFactory().get(
+            '/api/recipes/download_shopping_cart/', {'format': format}
+        )
+        force_authenticate(request, user=user)
+        response = RecipeViewSet.as_view(
+            {'get': 'download_shopping_cart'},
+            **RecipeViewSet.download_shopping_cart.kwargs
+        )(request)
+        yield from response.streaming_content
+
+    def report(self, name, method, *args):
+        tracemalloc.start()
+        start = time.perf_counter()
+        first_chunk = None
+        size = 0
+        for chunk in method(*args):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            size += len(chunk)
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{name}: first byte {first_chunk * 1000:.1f} ms, '
+            f'total {total * 1000:.1f} ms, '
+            f'peak memory {peak / 1024:.0f} KiB, size {size} bytes'
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import get_catalog_stats, get_catalog_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Статистика кэша тегов и ингредиентов по всем процессам '
+        'с запуска gunicorn.'
+    )
+
+    def handle(self, *args, **kwargs):
+        hits, misses = get_catalog_stats()
+        total = hits + misses
+        ratio = hits / total if total else 0
+        self.stdout.write(
+            f'Версия каталога: {get_catalog_version()}\n'
+            f'Попадания: {hits}\n'
+            f'Промахи: {misses}\n'
+            f'Доля попаданий: {ratio:.2%}'
+        )
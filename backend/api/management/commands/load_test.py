@@ -0,0 +1,155 @@
+import math
+import random
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон основных эндпоинтов API через тестовый клиент: '
+        'задержка p50/p95/p99 и число SQL-запросов на запрос.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько пользователей с корзинами и подписками выбрать'
+        )
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        users = list(User.objects.filter(
+            shopping_carts__isnull=False, follower__isnull=False
+        ).distinct().order_by('id')[:options['users']])
+        if not users:
+            raise CommandError(
+                'Нет пользователей с корзинами и подписками, '
+                'сгенерируйте данные командой seed_benchmark'
+            )
+        self.tokens = [
+            Token.objects.get_or_create(user=user)[0].key for user in users
+        ]
+        self.names = list(
+            Ingredient.objects.values_list('name', flat=True)[:1000]
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.filter(
+                recipe_ingredients__isnull=False
+            ).values_list('id', flat=True).distinct()[:1000]
+        )
+        self.limit = options['limit']
+        self.pages = max(1, min(
+            10, math.ceil(Recipe.objects.count() / self.limit)
+        ))
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+            'localhost'
+        ).lstrip('.')
+        self.client = Client(HTTP_HOST=host)
+        scenarios = (
+            ('recipes', self.recipes),
+            ('popular', self.popular),
+            ('subscriptions', self.subscriptions),
+            ('ingredients', self.ingredients),
+            ('cook', self.cook),
+            ('download_shopping_cart', self.download_shopping_cart),
+        )
+        self.stdout.write(
+            f'{"scenario":<24}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"queries":>9}{"max q":>7}'
+        )
+        for name, scenario in scenarios:
+            for _ in range(options['warmup']):
+                self.request(*scenario())
+            timings = []
+            queries = []
+            for _ in range(options['requests']):
+                elapsed, count = self.request(*scenario())
+                timings.append(elapsed)
+                queries.append(count)
+            self.stdout.write(
+                f'{name:<24}'
+                + ''.join(
+                    f'{percentile(timings, percent) * 1000:>9.1f}'
+                    for percent in PERCENTILES
+                )
+                + f'{sum(queries) / len(queries):>9.1f}{max(queries):>7}'
+            )
+
+    def request(self, path, token=None):
+        headers = {}
+        if token is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = self.client.get(path, **headers)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f'{path}: код ответа {response.status_code}')
+        return elapsed, len(context.captured_queries)
+
+    def token(self):
+        return self.random.choice(self.tokens)
+
+    def recipes(self):
+        token = self.token() if self.random.random() < 0.5 else None
+        return (
+            f'/api/recipes/?page={self.random.randint(1, self.pages)}'
+            f'&limit={self.limit}',
+            token
+        )
+
+    def popular(self):
+        return (
+            f'/api/recipes/?ordering=popular&cursor=&limit={self.limit}',
+            None
+        )
+
+    def subscriptions(self):
+        return (
+            f'/api/users/subscriptions/?limit={self.limit}&recipes_limit=3',
+            self.token()
+        )
+
+    def ingredients(self):
+        name = self.random.choice(self.names) if self.names else 'а'
+        return (
+            f'/api/ingredients/?{urlencode({"name": name[:3]})}', None
+        )
+
+    def download_shopping_cart(self):
+        return '/api/recipes/download_shopping_cart/', self.token()
+
+    def cook(self):
+        ingredients = self.random.sample(
+            self.ingredient_ids, min(8, len(self.ingredient_ids))
+        )
+        return (
+            '/api/recipes/cook/?' + urlencode(
+                {'ingredients': ingredients, 'limit': self.limit}, doseq=True
+            ),
+            None
+        )
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_views = {}
+_caches = {}
+_last_flush = 0.0
+
+
+def observe_request(view, status, duration, queries, db_time,
+                    n_plus_one=False):
+    with _lock:
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = {
+                'count': 0,
+                'duration': 0.0,
+                'queries': 0,
+                'db_time': 0.0,
+                'n_plus_one': 0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                'statuses': {},
+            }
+        stats['count'] += 1
+        stats['duration'] += duration
+        stats['queries'] += queries
+        stats['db_time'] += db_time
+        stats['n_plus_one'] += n_plus_one
+        stats['buckets'][bisect_left(LATENCY_BUCKETS, duration)] += 1
+        status = str(status)
+        stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        try:
+            flush()
+        except OSError:
+            logger.warning('Не удалось сохранить метрики', exc_info=True)
+
+
+def observe_cache(name, hit):
+    with _lock:
+        stats = _caches.setdefault(name, {'hits': 0, 'misses': 0})
+        stats['hits' if hit else 'misses'] += 1
+
+
+def get_memory():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def snapshot():
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'memory': get_memory(),
+            'views': {
+                view: dict(
+                    stats,
+                    buckets=list(stats['buckets']),
+                    statuses=dict(stats['statuses'])
+                )
+                for view, stats in _views.items()
+            },
+            'caches': {name: dict(stats) for name, stats in _caches.items()},
+        }
+
+
+def flush():
+    """Сохраняет метрики процесса в METRICS_DIR/<pid>.json."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot(), file)
+    os.replace(temporary, path)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def load_snapshots():
+    snapshots = {}
+    try:
+        flush()
+        names = os.listdir(settings.METRICS_DIR)
+    except OSError:
+        logger.warning('Не удалось прочитать метрики', exc_info=True)
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        snapshots[data['pid']] = data
+    snapshots[os.getpid()] = snapshot()
+    return snapshots.values()
+
+
+def collect():
+    """Метрики всех процессов, включая завершившиеся."""
+    views = {}
+    caches = {}
+    memory = {}
+    for data in load_snapshots():
+        if is_alive(data['pid']):
+            memory[data['pid']] = data['memory']
+        for view, stats in data['views'].items():
+            total = views.get(view)
+            if total is None:
+                views[view] = dict(
+                    stats,
+                    buckets=list(stats['buckets']),
+                    statuses=dict(stats['statuses'])
+                )
+                continue
+            for key in ('count', 'duration', 'queries', 'db_time',
+                        'n_plus_one'):
+                total[key] += stats[key]
+            total['buckets'] = [
+                left + right
+                for left, right in zip(total['buckets'], stats['buckets'])
+            ]
+            for status, count in stats['statuses'].items():
+                total['statuses'][status] = (
+                    total['statuses'].get(status, 0) + count
+                )
+        for name, stats in data['caches'].items():
+            total = caches.setdefault(name, {'hits': 0, 'misses': 0})
+            total['hits'] += stats['hits']
+            total['misses'] += stats['misses']
+    return {'views': views, 'caches': caches, 'memory': memory}
+
+
+def get_view_stats():
+    return collect()['views']
+
+
+def format_labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"'
+        ).replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+
+
+def split_view(view):
+    viewset, _, action = view.rpartition('.')
+    return viewset or view, action
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    data = collect()
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{{{labels}}} {value}')
+
+    views = sorted(
+        (split_view(view), stats) for view, stats in data['views'].items()
+    )
+    family(
+        'foodgram_requests_total', 'counter', 'Requests by view and status.',
+        (
+            ('', format_labels(
+                viewset=viewset, action=action, status=status
+            ), count)
+            for (viewset, action), stats in views
+            for status, count in sorted(stats['statuses'].items())
+        )
+    )
+    histogram = []
+    for (viewset, action), stats in views:
+        cumulative = 0
+        bounds = [*map(str, LATENCY_BUCKETS), '+Inf']
+        for bound, count in zip(bounds, stats['buckets']):
+            cumulative += count
+            histogram.append(('_bucket', format_labels(
+                viewset=viewset, action=action, le=bound
+            ), cumulative))
+        labels = format_labels(viewset=viewset, action=action)
+        histogram.append(('_sum', labels, stats['duration']))
+        histogram.append(('_count', labels, stats['count']))
+    family(
+        'foodgram_request_duration_seconds', 'histogram',
+        'Request latency by view.', histogram
+    )
+    for name, key, help_text in (
+        ('foodgram_db_queries_total', 'queries', 'SQL queries by view.'),
+        ('foodgram_db_query_duration_seconds_total', 'db_time',
+         'Time spent in SQL queries by view.'),
+        ('foodgram_n_plus_one_requests_total', 'n_plus_one',
+         'Requests with repeated identical SQL shapes by view.'),
+    ):
+        family(name, 'counter', help_text, (
+            ('', format_labels(viewset=viewset, action=action), stats[key])
+            for (viewset, action), stats in views
+        ))
+    caches = sorted(data['caches'].items())
+    family('foodgram_cache_hits_total', 'counter', 'Cache hits.', (
+        ('', format_labels(cache=name), stats['hits'])
+        for name, stats in caches
+    ))
+    family('foodgram_cache_misses_total', 'counter', 'Cache misses.', (
+        ('', format_labels(cache=name), stats['misses'])
+        for name, stats in caches
+    ))
+    family('foodgram_cache_hit_ratio', 'gauge', 'Cache hit ratio.', (
+        ('', format_labels(cache=name),
+         stats['hits'] / (stats['hits'] + stats['misses']))
+        for name, stats in caches if stats['hits'] + stats['misses']
+    ))
+    family(
+        'foodgram_process_resident_memory_bytes', 'gauge',
+        'Resident memory of live worker processes.',
+        (
+            ('', format_labels(pid=pid), memory)
+            for pid, memory in sorted(data['memory'].items())
+        )
+    )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,115 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import observe_request
+
+logger = logging.getLogger('api.requests')
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SQL_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def sql_shape(sql):
+    return SQL_PLACEHOLDER_LISTS.sub(
+        '(%s, ...)', SQL_LITERALS.sub('%s', sql)
+    )
+
+
+def get_view_name(view_func, request):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class RequestMetricsMiddleware:
+    """Число и время SQL-запросов, время рендеринга и размер ответа."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_view = 'unresolved'
+        request.metrics_render_time = 0.0
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        repeated = recorder.repeated(settings.N_PLUS_ONE_THRESHOLD)
+        render_time = request.metrics_render_time
+        observe_request(
+            request.metrics_view, response.status_code, duration,
+            recorder.count, recorder.time, bool(repeated)
+        )
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={recorder.time * 1000:.1f};'
+                f'desc="{recorder.count} queries"',
+                f'render;dur={render_time * 1000:.1f}',
+                f'app;dur='
+                f'{(duration - recorder.time - render_time) * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ))
+        size = None if response.streaming else len(response.content)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': request.metrics_view,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'db_queries': recorder.count,
+            'db_ms': round(recorder.time * 1000, 1),
+            'render_ms': round(render_time * 1000, 1),
+            'size': size,
+        }, ensure_ascii=False))
+        for shape, count in repeated:
+            logger.warning(json.dumps({
+                'n_plus_one': request.metrics_view,
+                'path': request.path,
+                'count': count,
+                'sql': shape[:300],
+            }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(view_func, request)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.metrics_render_time = time.perf_counter() - start
+        response.add_post_render_callback(rendered)
+        return response
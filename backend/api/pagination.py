@@ -1,5 +1,199 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+
+
+def estimate_count(queryset):
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class Paginator(PageNumberPagination):
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        self.count_mode = request.query_params.get(
+            self.count_query_param,
+            COUNT_NONE if self.cursor_mode else COUNT_EXACT
+        )
+        if self.count_mode not in (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE):
+            self.count_mode = COUNT_EXACT
+        if self.cursor_mode:
+            return self.paginate_cursor(queryset, request, view)
+        if self.count_mode == COUNT_EXACT:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_without_count(queryset, request)
+
+    def get_count(self, queryset):
+        if self.count_mode == COUNT_EXACT:
+            return queryset.count()
+        if self.count_mode == COUNT_ESTIMATE:
+            return estimate_count(queryset)
+        return None
+
+    def paginate_without_count(self, queryset, request):
+        self.page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param),
+                message=''
+            ))
+        self.count = self.get_count(queryset)
+        offset = (self.page_number - 1) * self.page_size
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.has_previous = self.page_number > 1
+        return results[:self.page_size]
+
+    def get_cursor_ordering(self, view):
+        return getattr(view, 'cursor_ordering', self.cursor_ordering)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return data['p'], bool(data['r'])
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        position = [
+            getattr(item, field.lstrip('-')) for field in self.ordering
+        ]
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            {'p': position, 'r': int(reverse)}, default=str
+        ).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    def parse_position(self, model, ordering, position):
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(ordering, position):
+            try:
+                value = model._meta.get_field(field.lstrip('-')).to_python(
+                    value
+                )
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def keyset_filter(self, ordering, position):
+        keyset = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset
+
+    def paginate_cursor(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_cursor_ordering(view)
+        position, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        self.count = self.get_count(queryset)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.parse_position(queryset.model, ordering, position)
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.results = results
+        return results
+
+    def get_next_link(self):
+        if self.cursor_mode:
+            if not self.has_next or not self.results:
+                return None
+            return self.encode_cursor(self.results[-1], reverse=False)
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.cursor_mode:
+            if not self.has_previous or not self.results:
+                return None
+            return self.encode_cursor(self.results[0], reverse=True)
+        if self.count_mode == COUNT_EXACT:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode and self.count_mode == COUNT_EXACT:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict((
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -18,3 +19,12 @@ class AuthorOrReadOnly(permissions.BasePermission):
             request.method in permissions.SAFE_METHODS
             or object.author == request.user
         )
+
+
+class MetricsAccess(permissions.BasePermission):
+
+    def has_permission(self, request, view):
+        return (
+            request.user.is_staff
+            or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        )
@@ -0,0 +1,115 @@
+import csv
+import datetime
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+RECIPES_TITLE = 'Рецепты:'
+CSV_HEADER = ('Продукт', 'Количество', 'Единица измерения')
+
+CHUNK_SIZE = 64 * 1024
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 16
+PDF_MARGIN = 50
+PDF_FALLBACK_FONT = 'Helvetica'
+
+logger = logging.getLogger(__name__)
+
+
+def shopping_list_lines(ingredients, recipes):
+    yield datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    yield SHOPPING_LIST_TITLE
+    for index, ingredient in enumerate(ingredients, 1):
+        yield (f"{index}. {ingredient['ingredient__name'].capitalize()} "
+               f"- {ingredient['total']} "
+               f"({ingredient['ingredient__measurement_unit']}).")
+    yield ''
+    yield RECIPES_TITLE
+    for recipe in recipes:
+        yield f'{recipe}'
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+    def stream(self, ingredients, recipes):
+        for line in shopping_list_lines(ingredients, recipes):
+            yield f'{line}\n'.encode(self.charset)
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients, recipes):
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER).encode(self.charset)
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['total'],
+                ingredient['ingredient__measurement_unit'],
+            )).encode(self.charset)
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def get_font(self):
+        if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return PDF_FONT_NAME
+        if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+            # В Helvetica нет кириллицы: вместо названий будут квадраты.
+            logger.error(
+                'Шрифт для PDF не найден: %s, кириллица не будет '
+                'отображаться. Укажите TTF-шрифт в SHOPPING_LIST_PDF_FONT',
+                settings.SHOPPING_LIST_PDF_FONT
+            )
+            return PDF_FALLBACK_FONT
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+        )
+        return PDF_FONT_NAME
+
+    def stream(self, ingredients, recipes):
+        font = self.get_font()
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE) as file:
+            pdf = canvas.Canvas(file, pagesize=A4)
+            width, height = A4
+            y = height - PDF_MARGIN
+            pdf.setFont(font, PDF_FONT_SIZE)
+            for line in shopping_list_lines(ingredients, recipes):
+                if y < PDF_MARGIN:
+                    pdf.showPage()
+                    pdf.setFont(font, PDF_FONT_SIZE)
+                    y = height - PDF_MARGIN
+                pdf.drawString(PDF_MARGIN, y, line)
+                y -= PDF_LINE_HEIGHT
+            pdf.save()
+            file.seek(0)
+            yield from iter(lambda: file.read(CHUNK_SIZE), b'')
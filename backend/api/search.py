@@ -0,0 +1,160 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from api.cache import (
+    get_catalog_version,
+    get_recipe_changes,
+    get_recipe_ingredients_version
+)
+from recipes.models import Ingredient, RecipeIngredient
+
+INGREDIENT_SEARCH_LIMIT = 50
+COOK_INCREMENTAL_LIMIT = 500
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = ([], [])
+
+    def build(self, rows):
+        entries = sorted((name.lower(), pk) for pk, name in rows)
+        self.entries = (
+            [name for name, _ in entries],
+            [pk for _, pk in entries]
+        )
+
+    def refresh(self):
+        version = get_catalog_version()
+        if self.version == version:
+            return
+        with self.lock:
+            if self.version != version:
+                self.build(
+                    Ingredient.objects.values_list('id', 'name').iterator()
+                )
+                self.version = version
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT, contains=True):
+        names, ids = self.entries
+        query = query.lower()
+        found = []
+        index = bisect_left(names, query)
+        while (
+            index < len(names)
+            and len(found) < limit
+            and names[index].startswith(query)
+        ):
+            found.append(ids[index])
+            index += 1
+        if contains and len(found) < limit:
+            for name, pk in zip(names, ids):
+                if query in name and not name.startswith(query):
+                    found.append(pk)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+ingredient_index = IngredientIndex()
+
+
+class CookIndex:
+    """Составы всех рецептов в памяти процесса.
+
+    Для рецепта хранится отсортированный массив id продуктов, для продукта —
+    множество рецептов с ним. Подбор по набору продуктов обходит только
+    рецепты, в которых есть хотя бы один из них.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.recipes = {}
+        self.postings = defaultdict(set)
+
+    @staticmethod
+    def load(recipe_ids=None):
+        rows = RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id')
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+        return {
+            recipe_id: array('q', sorted({
+                ingredient_id for _, ingredient_id in group
+            }))
+            for recipe_id, group in groupby(
+                rows.values_list('recipe_id', 'ingredient_id').iterator(),
+                key=itemgetter(0)
+            )
+        }
+
+    def build(self, recipes):
+        postings = defaultdict(set)
+        for recipe_id, ingredients in recipes.items():
+            for ingredient_id in ingredients:
+                postings[ingredient_id].add(recipe_id)
+        self.recipes, self.postings = recipes, postings
+
+    def apply(self, recipe_ids):
+        loaded = self.load(recipe_ids)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.recipes.pop(recipe_id, ()):
+                self.postings[ingredient_id].discard(recipe_id)
+            ingredients = loaded.get(recipe_id)
+            if ingredients:
+                self.recipes[recipe_id] = ingredients
+                for ingredient_id in ingredients:
+                    self.postings[ingredient_id].add(recipe_id)
+
+    def refresh(self):
+        version = get_recipe_ingredients_version()
+        if self.version == version:
+            return
+        with self.lock:
+            if self.version == version:
+                return
+            changes = None
+            if (
+                self.version is not None
+                and 0 < version - self.version <= COOK_INCREMENTAL_LIMIT
+            ):
+                changes = get_recipe_changes(self.version, version)
+            if changes is None or len(changes) > COOK_INCREMENTAL_LIMIT:
+                self.build(self.load())
+            else:
+                self.apply(changes)
+            self.version = version
+
+    def match(self, ingredient_ids, limit, min_coverage=0.0):
+        """Лучшие по покрытию рецепты: (id, покрытие, недостающие продукты).
+
+        Покрытие — доля продуктов рецепта, которые есть в наборе.
+        """
+        have = set(ingredient_ids)
+        hits = Counter()
+        with self.lock:
+            for ingredient_id in have:
+                hits.update(self.postings.get(ingredient_id, ()))
+            recipes = self.recipes
+            ranked = heapq.nlargest(limit, (
+                (found / len(recipes[recipe_id]), found, recipe_id)
+                for recipe_id, found in hits.items()
+            ))
+            return [
+                (recipe_id, coverage, [
+                    ingredient_id for ingredient_id in recipes[recipe_id]
+                    if ingredient_id not in have
+                ])
+                for coverage, _, recipe_id in ranked
+                if coverage >= min_coverage
+            ]
+
+
+cook_index = CookIndex()
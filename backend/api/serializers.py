@@ -1,12 +1,21 @@
 import base64
+import binascii
+import hashlib
+import tempfile
 from collections import Counter
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.cache import get_user_relations, record_recipe_changes
+from recipes.images import THUMBNAIL_WIDTH, VARIANT_WIDTHS, get_variant_name
 from recipes.models import (
     Favourite,
     Ingredient,
@@ -14,23 +23,112 @@ from recipes.models import (
     RecipeIngredient,
     Subscribe,
     ShoppingCart,
+    ShoppingCartTotal,
     Tag
 )
+from recipes.recommendations import queue_recipes
 
 User = get_user_model()
 
 MESSAGE_SUB_ISSUED = 'Подписка уже оформлена'
 MESSAGE_SUB_YOURSELF = 'Подписка на самого себя невозможна'
+MESSAGE_RECIPES_LIMIT = 'Укажите целое число от 0 до {max}'
+MESSAGE_NOT_FOUND = 'Не найдены {what_show} с id: {ids}'
+
+RECIPES_LIMIT_MAX = 100
+LIMIT_MAX = 100
+COOK_INGREDIENTS_MAX = 100
+
+BASE64_PREFIX = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def get_image_extension(header):
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return RECIPES_LIMIT_MAX
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        recipes_limit = -1
+    if recipes_limit < 0:
+        raise serializers.ValidationError({
+            'recipes_limit': MESSAGE_RECIPES_LIMIT.format(
+                max=RECIPES_LIMIT_MAX
+            )
+        })
+    return min(recipes_limit, RECIPES_LIMIT_MAX)
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'image_too_large': 'Размер изображения превышает {max_size} байт.',
+        'invalid_base64': 'Некорректные данные изображения.',
+        'invalid_format': 'Неподдерживаемый формат изображения.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        start = data.find(BASE64_PREFIX)
+        if start == -1:
+            self.fail('invalid_base64')
+        start += len(BASE64_PREFIX)
+        max_size = settings.MAX_IMAGE_SIZE
+        if (len(data) - start) * 3 // 4 > max_size:
+            self.fail('image_too_large', max_size=max_size)
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        digest = hashlib.sha256()
+        rest = ''
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[position:position + BASE64_CHUNK_SIZE].split()
+            )
+            if position + BASE64_CHUNK_SIZE >= len(data):
+                chunk += '=' * (-len(chunk) % 4)
+            cut = len(chunk) - len(chunk) % 4
+            chunk, rest = chunk[:cut], chunk[cut:]
+            try:
+                decoded = base64.b64decode(chunk, validate=True)
+            except binascii.Error:
+                file.close()
+                self.fail('invalid_base64')
+            digest.update(decoded)
+            file.write(decoded)
+        size = file.tell()
+        file.seek(0)
+        extension = get_image_extension(file.read(12))
+        if extension is None:
+            file.close()
+            self.fail('invalid_format')
+        file.seek(0)
+        return UploadedFile(
+            file,
+            name=f'{digest.hexdigest()}.{extension}',
+            content_type=f'image/{extension}',
+            size=size
+        )
+
 
 class FavouriteSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(
@@ -52,11 +150,44 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class GetRecipesSerializer(serializers.ModelSerializer):
+class RecipeImageVariantsSerializer(serializers.ModelSerializer):
+    image_thumb = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
+    def build_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    def get_image_thumb(self, recipe):
+        if not recipe.image:
+            return None
+        if recipe.image_variants != recipe.image.name:
+            return self.build_url(recipe.image.name)
+        return self.build_url(
+            get_variant_name(recipe.image.name, THUMBNAIL_WIDTH)
+        )
+
+    def get_image_srcset(self, recipe):
+        if not recipe.image or recipe.image_variants != recipe.image.name:
+            return None
+        return ', '.join(
+            f'{self.build_url(get_variant_name(recipe.image.name, width))} '
+            f'{width}w'
+            for width in VARIANT_WIDTHS
+        )
+
+
+class GetRecipesSerializer(RecipeImageVariantsSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'image_thumb', 'image_srcset',
+            'cooking_time'
+        )
 
 
 class SubscribeModelSerializer(serializers.ModelSerializer):
@@ -81,7 +212,6 @@ class SubscribeModelSerializer(serializers.ModelSerializer):
 class SubscribeUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -97,21 +227,18 @@ class SubscribeUserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, user):
-        return user.following.filter(
-            user=self.context.get('request').user
-        ).exists()
+        return user.id in get_user_relations(
+            self.context.get('request')
+        ).following
 
     def get_recipes(self, user):
-        recipes_limit = self.context.get(
-            'request'
-        ).GET.get('recipes_limit', 10**10)
-        return GetRecipesSerializer(
-            user.recipes.all()[:int(recipes_limit)],
-            many=True
-        ).data
-
-    def get_recipes_count(self, user):
-        return user.recipes.count()
+        if hasattr(user, 'limited_recipes'):
+            recipes = user.limited_recipes
+        else:
+            recipes = user.recipes.all()[
+                :get_recipes_limit(self.context.get('request'))
+            ]
+        return GetRecipesSerializer(recipes, many=True).data
 
 
 class UserSerializer(UserSerializer):
@@ -129,10 +256,9 @@ class UserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, user):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return user.following.filter(user=request.user).exists()
+        return user.id in get_user_relations(
+            self.context.get('request')
+        ).following
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -155,7 +281,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
@@ -170,17 +296,18 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         return amount
 
 
-class RecipeAddSerializer(serializers.ModelSerializer):
+class RecipeAddSerializer(RecipeImageVariantsSerializer):
     image = Base64ImageField(required=False, allow_null=True)
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'name', 'image', 'cooking_time'
+            'id', 'name', 'image', 'image_thumb', 'image_srcset',
+            'cooking_time'
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(RecipeImageVariantsSerializer):
     ingredients = RecipeIngredientSerializer(
         many=True,
         source='recipe_ingredients'
@@ -195,30 +322,24 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'name', 'image', 'image_thumb',
+            'image_srcset', 'text', 'cooking_time', 'favorites_count',
         )
         read_only_fields = ('author',)
 
-    def field_validate(self, recipe, model):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return model.objects.filter(user=request.user,
-                                    recipe=recipe).exists()
+    def get_relations(self):
+        return get_user_relations(self.context.get('request'))
 
     def get_is_favorited(self, recipe):
-        model = Favourite
-        return self.field_validate(recipe, model)
+        return recipe.id in self.get_relations().favourites
 
     def get_is_in_shopping_cart(self, recipe):
-        model = ShoppingCart
-        return self.field_validate(recipe, model)
+        return recipe.id in self.get_relations().cart
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
         required=True
     )
     ingredients = RecipeIngredientCreateSerializer(many=True)
@@ -253,27 +374,45 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     f'{", ".join(items)}')
             )
 
+    def get_objects(self, model, ids, what_show):
+        objects = model.objects.in_bulk(ids)
+        missing = [str(pk) for pk in dict.fromkeys(ids) if pk not in objects]
+        if missing:
+            raise serializers.ValidationError(MESSAGE_NOT_FOUND.format(
+                what_show=what_show,
+                ids=', '.join(missing)
+            ))
+        return [objects[pk] for pk in ids]
+
     def validate_tags(self, tags):
+        tags = self.get_objects(Tag, tags, 'теги')
         self.fields_validate(tags, 'тег')
         return tags
 
     def validate_ingredients(self, ingredients):
-        ingredients_unpacked = [
-            ingredient['id'] for ingredient in ingredients
-        ]
+        ingredients_unpacked = self.get_objects(
+            Ingredient,
+            [ingredient['id'] for ingredient in ingredients],
+            'ингредиенты'
+        )
         self.fields_validate(ingredients_unpacked, 'ингредиент')
+        for ingredient, instance in zip(ingredients, ingredients_unpacked):
+            ingredient['id'] = instance
         return ingredients
 
     def add_ingredients(self, ingredients, recipe):
+        if not ingredients:
+            return
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
-                ingredient=Ingredient.objects.get(id=ingredient['id'].id),
+                ingredient=ingredient['id'],
                 recipe=recipe,
                 amount=ingredient['amount']
             )
             for ingredient in ingredients
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients')
@@ -281,20 +420,75 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data, author=author)
         recipe.tags.set(tags_data)
         self.add_ingredients(ingredients, recipe)
+        self.ingredients_changed(recipe)
         return recipe
 
+    def ingredients_changed(self, recipe):
+        # bulk_create и bulk_update не отправляют сигналов.
+        recipe_id = recipe.pk
+        queue_recipes((recipe_id,))
+        transaction.on_commit(lambda: record_recipe_changes((recipe_id,)))
+
+    def update_ingredients(self, instance, ingredients):
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        deltas = dict(amounts)
+        existing = {}
+        to_update = []
+        to_delete = []
+        for recipe_ingredient in instance.recipe_ingredients.all():
+            ingredient = recipe_ingredient.ingredient_id
+            deltas[ingredient] = (
+                deltas.get(ingredient, 0) - recipe_ingredient.amount
+            )
+            if ingredient not in amounts or ingredient in existing:
+                to_delete.append(recipe_ingredient.pk)
+                continue
+            existing[ingredient] = recipe_ingredient
+            if recipe_ingredient.amount != amounts[ingredient]:
+                recipe_ingredient.amount = amounts[ingredient]
+                to_update.append(recipe_ingredient)
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['id'].id not in existing
+        ]
+        self.add_ingredients(added, instance)
+        if to_delete or to_update or added:
+            self.ingredients_changed(instance)
+        if any(deltas.values()):
+            ShoppingCartTotal.objects.apply_deltas(
+                ShoppingCart.objects.filter(
+                    recipe=instance
+                ).values_list('user', flat=True),
+                deltas
+            )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.add_ingredients(ingredients, instance)
-        instance.tags.set(tags)
-        super().update(instance, validated_data)
-        return instance
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context.get('request')
+        prefetch_related_objects(
+            (instance,),
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
         return RecipeSerializer(
             instance,
             context={'request': request}
@@ -313,3 +507,22 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
                 message='Этот рецепт уже есть в списке покупок!'
             )
         ]
+
+
+class LimitQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=LIMIT_MAX,
+        default=settings.REST_FRAMEWORK['PAGE_SIZE']
+    )
+
+
+class CookQuerySerializer(LimitQuerySerializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=COOK_INGREDIENTS_MAX
+    )
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, default=0
+    )
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from api.cache import (
+    bump_catalog_version,
+    bump_user_relations_generation,
+    delete_recipe_cards,
+    record_recipe_changes
+)
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscribe,
+    Tag,
+    User
+)
+
+USER_CARD_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def invalidate_recipe_cards(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: delete_recipe_cards(recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_card(sender, instance, **kwargs):
+    invalidate_recipe_cards((instance.pk,))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    invalidate_recipe_cards((instance.recipe_id,))
+
+
+def record_recipe_change(recipe_id):
+    transaction.on_commit(lambda: record_recipe_changes((recipe_id,)))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def record_recipe_ingredients_change(sender, instance, **kwargs):
+    record_recipe_change(
+        instance.pk if sender is Recipe else instance.recipe_id
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if reverse and action == 'pre_clear':
+        # После очистки связей рецепты тега уже не найти.
+        instance._cleared_recipe_ids = list(
+            instance.recipes.values_list('id', flat=True)
+        )
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe_cards((instance.pk,))
+    elif action == 'post_clear':
+        invalidate_recipe_cards(instance.__dict__.pop(
+            '_cleared_recipe_ids', ()
+        ))
+    else:
+        invalidate_recipe_cards(pk_set)
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def invalidate_tag_recipes(sender, instance, **kwargs):
+    invalidate_recipe_cards(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_recipe_cards(Recipe.objects.filter(
+            recipe_ingredients__ingredient=instance
+        ).values_list('id', flat=True).distinct())
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, created, update_fields,
+                              **kwargs):
+    if created or (
+        update_fields is not None
+        and not USER_CARD_FIELDS.intersection(update_fields)
+    ):
+        return
+    invalidate_recipe_cards(instance.recipes.values_list('id', flat=True))
+
+
+def change_user_relations(user_id):
+    transaction.on_commit(lambda: bump_user_relations_generation(user_id))
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribe)
+def add_user_relation(sender, instance, created, **kwargs):
+    if created:
+        change_user_relations(instance.user_id)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscribe)
+def remove_user_relation(sender, instance, **kwargs):
+    change_user_relations(instance.user_id)
@@ -0,0 +1,195 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.cache import load_user_relations
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscribe,
+    Tag,
+    User
+)
+
+RECIPES = 100
+# Число рецептов и страница; карточки и связи пользователя в кэше.
+CACHED_RECIPE_LIST_QUERIES = 2
+# Без кэша ещё связи пользователя одним запросом и карточки: рецепты,
+# теги, авторы и продукты.
+RECIPE_LIST_QUERIES = CACHED_RECIPE_LIST_QUERIES + 5
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipeListQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.local', username='user',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{index}@foodgram.local',
+                username=f'author{index}',
+                first_name='Имя', last_name='Фамилия', password='password'
+            )
+            for index in range(5)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', slug=f'tag-{index}',
+                color=f'#00000{index}'
+            )
+            for index in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {index}', measurement_unit='г'
+            )
+            for index in range(10)
+        ]
+        for index in range(RECIPES):
+            recipe = Recipe.objects.create(
+                author=authors[index % len(authors)],
+                name=f'Рецепт {index}', text='-', cooking_time=1,
+                image='recipes/images/test.png'
+            )
+            recipe.tags.set(tags[:1 + index % len(tags)])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (index + shift) % len(ingredients)
+                    ],
+                    amount=shift + 1
+                )
+                for shift in range(3)
+            )
+            if index % 2:
+                Favourite.objects.create(user=cls.user, recipe=recipe)
+            if index % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscribe.objects.create(user=cls.user, author=authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_recipes(self, limit):
+        response = self.client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return response
+
+    def test_query_count_does_not_depend_on_limit(self):
+        for limit in (6, RECIPES):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    self.get_recipes(limit)
+
+    def test_cached_cards_query_count_does_not_depend_on_limit(self):
+        self.get_recipes(RECIPES)
+        for limit in (6, RECIPES):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(CACHED_RECIPE_LIST_QUERIES):
+                    self.get_recipes(limit)
+
+    def test_user_flags(self):
+        results = {
+            recipe['id']: recipe
+            for recipe in self.get_recipes(RECIPES).data['results']
+        }
+        for recipe in Recipe.objects.all():
+            card = results[recipe.pk]
+            self.assertEqual(
+                card['is_favorited'],
+                Favourite.objects.filter(
+                    user=self.user, recipe=recipe
+                ).exists()
+            )
+            self.assertEqual(
+                card['is_in_shopping_cart'],
+                ShoppingCart.objects.filter(
+                    user=self.user, recipe=recipe
+                ).exists()
+            )
+            self.assertEqual(
+                card['author']['is_subscribed'],
+                Subscribe.objects.filter(
+                    user=self.user, author=recipe.author
+                ).exists()
+            )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UserRelationsCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.local', username='user', password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='-', cooking_time=1,
+            image='recipes/images/test.png'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_change_is_visible_after_commit(self):
+        self.assertEqual(load_user_relations(self.user.pk).favourites, set())
+        with self.captureOnCommitCallbacks(execute=True):
+            Favourite.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(
+            load_user_relations(self.user.pk).favourites, {self.recipe.pk}
+        )
+
+    def test_commit_during_load_does_not_leave_stale_sets(self):
+        set_many = cache.set_many
+
+        def commit_then_set_many(*args, **kwargs):
+            # Изменение коммитится после чтения связей из БД, но до
+            # записи прочитанных множеств в кэш.
+            with self.captureOnCommitCallbacks(execute=True):
+                Favourite.objects.create(user=self.user, recipe=self.recipe)
+            set_many(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set_many', commit_then_set_many):
+            self.assertEqual(
+                load_user_relations(self.user.pk).favourites, set()
+            )
+        self.assertEqual(
+            load_user_relations(self.user.pk).favourites, {self.recipe.pk}
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryPlansTest(TestCase):
+
+    def test_no_full_table_scans(self):
+        call_command('check_query_plans', stdout=StringIO())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AdminQueriesTest(TestCase):
+
+    def test_changelist_query_count_is_constant(self):
+        call_command('check_admin_queries', stdout=StringIO())
@@ -2,7 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (IngredientViewSet,
+                       MetricsView,
                        RecipeViewSet,
+                       RequestStatsView,
                        TagViewSet,
                        UserViewSet
                        )
@@ -16,5 +18,7 @@ router.register('users', UserViewSet, basename='users')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('auth/', include('djoser.urls.authtoken'))
+    path('auth/', include('djoser.urls.authtoken')),
+    path('stats/requests/', RequestStatsView.as_view()),
+    path('metrics', MetricsView.as_view()),
 ]
@@ -1,5 +1,13 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
-from django.http import FileResponse
+from django.db import connection
+from django.db.models import (
+    F,
+    Window
+)
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
@@ -8,15 +16,31 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import (
     AllowAny,
+    IsAdminUser,
     IsAuthenticatedOrReadOnly,
     IsAuthenticated
 )
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 
-from .filters import IngredientSearchFilter, RecipeFilter
+from .cache import (
+    CatalogCacheMixin,
+    RecipeCardCacheMixin,
+    get_user_relations
+)
+from .filters import RECIPE_ORDERINGS, IngredientSearchFilter, RecipeFilter
+from .metrics import LATENCY_BUCKETS, get_view_stats, render_metrics
+from .renderers import (
+    CSVShoppingListRenderer,
+    PDFShoppingListRenderer,
+    TextShoppingListRenderer,
+)
+from .search import cook_index
 from .serializers import (
+    CookQuerySerializer,
     IngredientSerializer,
+    LimitQuerySerializer,
     RecipeSerializer,
     RecipeAddSerializer,
     RecipeCreateSerializer,
@@ -24,19 +48,20 @@ from .serializers import (
     SubscribeUserSerializer,
     TagSerializer,
     UserSerializer,
+    get_recipes_limit,
 )
-from .text_to_print import text_to_print
-from .permissions import AuthorOrReadOnly
+from .permissions import AuthorOrReadOnly, MetricsAccess
 from .pagination import Paginator
 from recipes.models import (
     Favourite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
     Subscribe,
     ShoppingCart,
+    ShoppingCartTotal,
     Tag,
 )
+from recipes.recommendations import recommend
 
 User = get_user_model()
 
@@ -45,6 +70,7 @@ class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    cursor_ordering = ('username', 'id')
 
     def get_permissions(self):
         if self.action == 'me':
@@ -55,9 +81,17 @@ class UserViewSet(UserViewSet):
             detail=False,
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
+        recipes_limit = get_recipes_limit(request)
         paginator = Paginator()
-        authors = User.objects.filter(following__user=request.user)
-        result_page = paginator.paginate_queryset(authors, request)
+        authors = User.objects.filter(
+            following__user=request.user
+        ).order_by('username')
+        result_page = paginator.paginate_queryset(
+            authors, request, view=self
+        )
+        recipes = self.get_limited_recipes(result_page, recipes_limit)
+        for author in result_page:
+            author.limited_recipes = recipes[author.id]
         serializer = SubscribeUserSerializer(
             result_page,
             context={'request': request},
@@ -65,6 +99,32 @@ class UserViewSet(UserViewSet):
         )
         return paginator.get_paginated_response(serializer.data)
 
+    def get_limited_recipes(self, authors, limit):
+        recipes = defaultdict(list)
+        if not authors or not limit:
+            return recipes
+        queryset = Recipe.objects.filter(author__in=authors)
+        if connection.features.supports_over_clause:
+            sql, params = queryset.order_by().annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author'),
+                    order_by=F('pub_date').desc()
+                )
+            ).query.sql_with_params()
+            queryset = Recipe.objects.raw(
+                f'SELECT * FROM ({sql}) AS ranked '
+                f'WHERE ranked.row_number <= %s '
+                f'ORDER BY ranked.author_id, ranked.row_number',
+                (*params, limit)
+            )
+        else:
+            queryset = queryset.order_by('author', '-pub_date')
+        for recipe in queryset:
+            if len(recipes[recipe.author_id]) < limit:
+                recipes[recipe.author_id].append(recipe)
+        return recipes
+
     @action(methods=['post', 'delete'],
             detail=True,
             permission_classes=(IsAuthenticated,)
@@ -91,7 +151,7 @@ class UserViewSet(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(RecipeCardCacheMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (
@@ -102,8 +162,15 @@ class RecipeViewSet(ModelViewSet):
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    @property
+    def cursor_ordering(self):
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'),
+            Paginator.cursor_ordering
+        )
+
     def get_serializer_class(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'cook', 'recommended'):
             return RecipeSerializer
         return RecipeCreateSerializer
 
@@ -139,24 +206,90 @@ class RecipeViewSet(ModelViewSet):
     def shopping_cart(self, request, pk=None):
         return self.shopping_cart_favorite(ShoppingCart, request, pk)
 
+    @action(detail=False)
+    def cook(self, request):
+        """Рецепты, которые можно приготовить из переданных продуктов."""
+        query = CookQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        cook_index.refresh()
+        matches = cook_index.match(
+            query.validated_data['ingredients'],
+            query.validated_data['limit'],
+            query.validated_data['min_coverage']
+        )
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'favorites_count'
+        ).in_bulk([recipe_id for recipe_id, _, _ in matches])
+        matches = [match for match in matches if match[0] in recipes]
+        cards = self.get_cards([
+            recipes[recipe_id] for recipe_id, _, _ in matches
+        ])
+        for card, (_, coverage, missing) in zip(cards, matches):
+            card['coverage'] = round(coverage, 3)
+            card['missing_ingredients'] = [
+                ingredient for ingredient in card['ingredients']
+                if ingredient['id'] in missing
+            ]
+        return Response(cards)
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
+    def recommended(self, request):
+        """Рецепты по избранному, корзине и подпискам пользователя."""
+        query = LimitQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = query.validated_data['limit']
+        relations = get_user_relations(request)
+        following_recipes = []
+        if relations.following:
+            following_recipes = Recipe.objects.filter(
+                author__in=relations.following
+            ).values_list('id', flat=True)[:limit]
+        recipe_ids = recommend(relations, following_recipes, limit * 2)
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'favorites_count'
+        ).exclude(author=request.user).in_bulk(recipe_ids)
+        recipes = [
+            recipes[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in recipes
+        ][:limit]
+        if not recipes:
+            recipes = list(self.get_queryset().exclude(
+                author=request.user
+            ).order_by(*RECIPE_ORDERINGS['popular']).only(
+                'id', 'author_id', 'favorites_count'
+            )[:limit])
+        return Response(self.get_cards(recipes))
+
+    @action(detail=False,
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(
+                TextShoppingListRenderer,
+                CSVShoppingListRenderer,
+                PDFShoppingListRenderer,
+            ))
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.ingredients_shopping_cart(
-            self,
-            request=request
-        )
+        ingredients = ShoppingCartTotal.objects.ingredients_shopping_cart(
+            request.user
+        ).iterator()
         recipes = ShoppingCart.objects.filter(
             user=request.user.id).values_list(
                 'recipe__name',
-                flat=True).order_by('recipe__name').distinct()
-        return FileResponse(
-            text_to_print(ingredients, recipes),
-            content_type='text/plain',
-            filename='products.txt'
+                flat=True).order_by('recipe__name').distinct().iterator()
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients, recipes),
+            content_type=content_type
         )
+        response['Content-Disposition'] = (
+            f'attachment; filename="products.{renderer.format}"'
+        )
+        return response
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
@@ -166,8 +299,29 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name', )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
+
+
+class RequestStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        buckets = [*map(str, LATENCY_BUCKETS), '+Inf']
+        return Response({
+            view: dict(stats, buckets=dict(zip(buckets, stats['buckets'])))
+            for view, stats in sorted(get_view_stats().items())
+        })
+
+
+class MetricsView(APIView):
+    permission_classes = (MetricsAccess,)
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
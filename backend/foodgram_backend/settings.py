@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -40,12 +41,12 @@ INSTALLED_APPS = [
     'djoser',
     'django_filters',
     'colorfield',
-    'debug_toolbar',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,9 +54,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -97,6 +101,22 @@ else:
         }
     }
 
+# Версии кэша меняются в одном процессе, а читаются во всех процессах
+# gunicorn, поэтому кэш должен быть общим. LocMemCache допустим только
+# с одним процессом, см. gunicorn.conf.py.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram-cache')
+        ),
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -136,6 +156,13 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', default=5 * 1024 * 1024))
+
+IMAGE_VARIANTS_ASYNC = os.getenv('IMAGE_VARIANTS_ASYNC', default='True') == 'True'
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', default=2))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -170,3 +197,42 @@ DJOSER = {
 
 
 IMPORT_FILES_DIR = 'data'
+
+SERVER_TIMING_HEADER = os.getenv(
+    'SERVER_TIMING_HEADER', default='True'
+) == 'True'
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', default=5))
+
+# Каждый процесс gunicorn сохраняет сюда свои метрики, /api/metrics
+# суммирует их. Каталог очищается при старте gunicorn.
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-metrics')
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=1))
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS',
+    default='127.0.0.1'
+).split(', ')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
@@ -0,0 +1,16 @@
+import shutil
+
+from django.core.exceptions import ImproperlyConfigured
+
+from foodgram_backend.settings import CACHES, METRICS_DIR
+
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def on_starting(server):
+    if CACHES['default']['BACKEND'] == LOCAL_CACHE and server.cfg.workers > 1:
+        raise ImproperlyConfigured(
+            'LocMemCache не разделяется между процессами gunicorn: '
+            'укажите общий кэш в CACHE_BACKEND или запустите один процесс'
+        )
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
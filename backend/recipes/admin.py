@@ -1,21 +1,60 @@
+from collections import Counter
+from contextlib import contextmanager
+
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.utils.safestring import mark_safe
 
+from .images import THUMBNAIL_WIDTH, get_variant_name
 from .models import (
     Favourite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingCartTotal,
     Tag,
 )
+from .search import search_recipes
 
 User = get_user_model()
 
 
+def get_amounts(recipe_ids):
+    amounts = Counter()
+    for recipe, ingredient, amount in RecipeIngredient.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe', 'ingredient', 'amount'):
+        amounts[recipe, ingredient] += amount
+    return amounts
+
+
+@contextmanager
+def updating_cart_totals(recipe_ids):
+    """Переносит правку продуктов рецептов в итоги списков покупок."""
+    recipe_ids = {recipe_id for recipe_id in recipe_ids if recipe_id}
+    with transaction.atomic():
+        before = get_amounts(recipe_ids)
+        yield
+        deltas = {recipe_id: Counter() for recipe_id in recipe_ids}
+        for (recipe, ingredient), amount in get_amounts(recipe_ids).items():
+            deltas[recipe][ingredient] += amount
+        for (recipe, ingredient), amount in before.items():
+            deltas[recipe][ingredient] -= amount
+        for recipe_id, recipe_deltas in deltas.items():
+            ShoppingCartTotal.objects.apply_deltas(
+                ShoppingCart.objects.filter(
+                    recipe=recipe_id
+                ).values_list('user', flat=True),
+                recipe_deltas
+            )
+
+
 @admin.register(User)
 class UserAdmin(UserAdmin):
     """Класс настройки раздела пользователей."""
@@ -26,24 +65,13 @@ class UserAdmin(UserAdmin):
         'email',
         'first_name',
         'last_name',
-        'follower_count',
-        'following_count',
+        'followers_count',
+        'subscriptions_count',
         'recipes_count'
     )
 
     search_fields = ('username',)
-
-    @admin.display(description='Подписчики')
-    def follower_count(self, user):
-        return user.follower.count()
-
-    @admin.display(description='Подписки')
-    def following_count(self, user):
-        return user.following.count()
-
-    @admin.display(description='Рецепты')
-    def recipes_count(self, user):
-        return user.recipes.count()
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -77,6 +105,36 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+class AuthorFilter(admin.SimpleListFilter):
+    """Самые активные авторы вместо списка всех пользователей.
+
+    Остальных авторов можно найти поиском по никнейму.
+    """
+
+    title = 'Автор'
+    parameter_name = 'author'
+    limit = 20
+
+    def lookups(self, request, model_admin):
+        authors = list(User.objects.filter(
+            recipes_count__gt=0
+        ).order_by('-recipes_count', 'username')[:self.limit])
+        selected = self.get_author_id()
+        if selected and all(author.pk != selected for author in authors):
+            authors += User.objects.filter(pk=selected)
+        return [(str(author.pk), author.username) for author in authors]
+
+    def get_author_id(self):
+        value = self.value()
+        return int(value) if value and value.isdigit() else None
+
+    def queryset(self, request, queryset):
+        author_id = self.get_author_id()
+        if author_id is None:
+            return queryset
+        return queryset.filter(author_id=author_id)
+
+
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = 1
@@ -94,19 +152,51 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_ingredients',
         'get_tags',
         'pub_date',
-        'in_favorite'
+        'favorites_count'
     )
 
     inlines = [
         RecipeIngredientInline,
     ]
 
-    list_filter = ('author', 'tags')
-    search_fields = ('author', 'name')
+    list_filter = (AuthorFilter, 'tags')
+    search_fields = ('name', 'text', '=author__username')
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def save_related(self, request, form, formsets, change):
+        with updating_cart_totals((form.instance.pk,)):
+            super().save_related(request, form, formsets, change)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(
+            Q(pk__in=search_recipes(queryset, search_term).values('pk'))
+            | Q(author__username=search_term)
+        ), False
 
     @admin.display(description='Картинка')
     def get_image(self, recipe):
-        return mark_safe(f'<img src={recipe.image.url} width="50" height="60"')
+        if not recipe.image:
+            return None
+        name = recipe.image.name
+        if recipe.image_variants == name:
+            name = get_variant_name(name, THUMBNAIL_WIDTH)
+        return mark_safe(
+            f'<img src={default_storage.url(name)} width="50" height="60"'
+        )
 
     @admin.display(description='Теги')
     def get_tags(self, recipe):
@@ -115,22 +205,15 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='Продукты')
     def get_ingredients(self, recipe):
-        recipe_ingredients = RecipeIngredient.objects.select_related(
-            'ingredient'
-        ).filter(recipe=recipe)
         return mark_safe(
             "<br>".join(
                 [
                     f'{recipe_ingredient.ingredient.name} -'
                     f' {recipe_ingredient.amount}'
                     f' ({recipe_ingredient.ingredient.measurement_unit})'
-                    for recipe_ingredient in recipe_ingredients
+                    for recipe_ingredient in recipe.recipe_ingredients.all()
                 ]))
 
-    @admin.display(description='В избранном')
-    def in_favorite(self, recipe):
-        return recipe.favourites.all().count()
-
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
@@ -147,6 +230,25 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     def measurement_unit(self, instance):
         return instance.ingredient.measurement_unit
 
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.update(RecipeIngredient.objects.filter(
+                pk=obj.pk
+            ).values_list('recipe', flat=True))
+        with updating_cart_totals(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with updating_cart_totals((obj.recipe_id,)):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with updating_cart_totals(
+            set(queryset.values_list('recipe', flat=True))
+        ):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(Favourite)
 class FavouriteAdmin(admin.ModelAdmin):
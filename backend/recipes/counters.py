@@ -0,0 +1,44 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favourite, Recipe, Subscribe, User
+
+# Модель со счётчиком, поле счётчика, считаемая модель и её внешний ключ.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favourite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'author'),
+    (User, 'subscriptions_count', Subscribe, 'user'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def get_actual_count(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counters(fix=True):
+    """Число расходящихся счётчиков по каждому полю."""
+    drift = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = get_actual_count(related_model, related_field)
+        queryset = model.objects.exclude(**{field: actual})
+        if fix:
+            drift[f'{model.__name__}.{field}'] = queryset.update(
+                **{field: get_actual_count(related_model, related_field)}
+            )
+        else:
+            drift[f'{model.__name__}.{field}'] = queryset.count()
+    return drift
@@ -0,0 +1,73 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+VARIANT_WIDTHS = (320, 640, 1280)
+THUMBNAIL_WIDTH = 320
+VARIANT_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+executor = None
+
+
+def get_variant_name(name, width):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{width}w.webp'
+
+
+def generate_variants(name):
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if image.mode in ('P', 'LA', 'PA') else 'RGB'
+            )
+        for width in VARIANT_WIDTHS:
+            variant_name = get_variant_name(name, width)
+            if default_storage.exists(variant_name):
+                continue
+            variant = image.copy()
+            variant.thumbnail((width, width * 4))
+            buffer = BytesIO()
+            variant.save(buffer, 'WEBP', quality=VARIANT_QUALITY)
+            default_storage.save(variant_name, ContentFile(buffer.getvalue()))
+    for recipe in Recipe.objects.filter(image=name):
+        recipe.image_variants = name
+        recipe.save(update_fields=['image_variants'])
+
+
+def run_generate_variants(name):
+    try:
+        generate_variants(name)
+    except Exception:
+        logger.exception('Не удалось создать варианты изображения %s', name)
+
+
+def run_in_worker(name):
+    try:
+        run_generate_variants(name)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(name):
+    global executor
+    if not settings.IMAGE_VARIANTS_ASYNC:
+        run_generate_variants(name)
+        return
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANTS_WORKERS,
+            thread_name_prefix='image-variants'
+        )
+    executor.submit(run_in_worker, name)
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import (
+    TOP_K,
+    build_similarities,
+    queue_recipes,
+    take_queue
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт похожих рецептов для рекомендаций. С --incremental '
+        'пересчитываются только рецепты, изменённые после прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Пересчитать только рецепты из очереди изменений'
+        )
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # Очередь забирается до загрузки данных: изменения, сделанные во
+        # время пересчёта, попадут в неё снова и войдут в следующий запуск.
+        queued = take_queue()
+        recipe_ids = queued if options['incremental'] else None
+        if recipe_ids == []:
+            self.stdout.write('Нет изменённых рецептов')
+            return
+        try:
+            total = build_similarities(
+                recipe_ids, options['batch_size'], options['top_k']
+            )
+        except Exception:
+            queue_recipes(queued)
+            raise
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {total} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+    User
+)
+
+PAGE_SIZE = 100
+
+# Допустимое число запросов на страницу списка в админке.
+MAX_QUERIES = {
+    '/admin/recipes/recipe/': 8,
+    '/admin/recipes/user/': 5,
+}
+
+
+class Command(BaseCommand):
+    help = ('Проверка числа запросов на страницах списков рецептов '
+            'и пользователей в админке: оно не должно зависеть от '
+            'числа строк.')
+
+    def handle(self, *args, **kwargs):
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+            'localhost'
+        ).lstrip('.')
+        client = Client(HTTP_HOST=host)
+        failures = []
+        with transaction.atomic():
+            admin = User.objects.create_superuser(
+                email='admin-queries@foodgram.local',
+                username='check_admin_queries',
+                password='check_admin_queries'
+            )
+            client.force_login(admin)
+            self.seed(1)
+            small = self.count_queries(client)
+            self.seed(PAGE_SIZE)
+            full = self.count_queries(client)
+            transaction.set_rollback(True)
+        for path, limit in MAX_QUERIES.items():
+            self.stdout.write(
+                f'{path}: {small[path]} запросов на 1 строку, '
+                f'{full[path]} на {PAGE_SIZE} строк, допустимо {limit}'
+            )
+            if full[path] != small[path] or full[path] > limit:
+                failures.append(path)
+        if failures:
+            raise CommandError(
+                f'Число запросов растёт или превышено: {", ".join(failures)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Число запросов в порядке'))
+
+    def count_queries(self, client):
+        counts = {}
+        for path in MAX_QUERIES:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{path}: код ответа {response.status_code}'
+                )
+            counts[path] = len(context.captured_queries)
+        return counts
+
+    def seed(self, count):
+        start = User.objects.count()
+        tags = [
+            Tag.objects.get_or_create(
+                slug=f'check-admin-{index}',
+                defaults={
+                    'name': f'check_admin_queries {index}',
+                    'color': f'#ABCDE{index}',
+                }
+            )[0]
+            for index in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.get_or_create(
+                name=f'check_admin_queries {index}', measurement_unit='г'
+            )[0]
+            for index in range(3)
+        ]
+        for index in range(start, start + count):
+            author = User.objects.create(
+                email=f'admin-queries-{index}@foodgram.local',
+                username=f'check_admin_queries_{index}'
+            )
+            recipe = Recipe.objects.create(
+                author=author, name=f'check_admin_queries {index}',
+                text='-', cooking_time=1, image='recipes/images/check.png'
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients
+            )
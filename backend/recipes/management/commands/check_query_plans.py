@@ -0,0 +1,150 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.filters import IngredientSearchFilter
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartTotal,
+    Subscribe,
+    Tag,
+    User
+)
+from recipes.search import filter_by_ingredients, search_recipes
+
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?\w+\s*$')
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов основных запросов: '
+            'команда завершается ошибкой при полном сканировании таблицы.')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов выполняется только на SQLite')
+        with transaction.atomic():
+            failures = []
+            for name, queryset in self.get_queries(*self.seed()):
+                plan = queryset.explain()
+                scans = [
+                    line for line in plan.splitlines()
+                    if FULL_SCAN.search(line)
+                ]
+                status = 'FAIL' if scans else 'OK'
+                self.stdout.write(f'{status} {name}\n{plan}\n')
+                if scans:
+                    failures.append(name)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                f'Полное сканирование таблиц: {", ".join(failures)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
+
+    def seed(self):
+        user = User.objects.create(
+            email='plans@foodgram.local', username='check_query_plans'
+        )
+        author = User.objects.create(
+            email='plans-author@foodgram.local',
+            username='check_query_plans_author'
+        )
+        tag = Tag.objects.create(
+            name='check_query_plans', slug='check-query-plans',
+            color='#ABCDEF'
+        )
+        ingredient = Ingredient.objects.create(
+            name='check_query_plans', measurement_unit='г'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='check_query_plans', text='-',
+            cooking_time=1
+        )
+        recipe.tags.add(tag)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=1
+        )
+        Favourite.objects.create(user=user, recipe=recipe)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        Subscribe.objects.create(user=user, author=author)
+        return user, author, tag, ingredient
+
+    def get_queries(self, user, author, tag, ingredient):
+        return (
+            ('recipes by pub_date', Recipe.objects.all()[:6]),
+            ('recipes by author', Recipe.objects.filter(author=author)[:6]),
+            (
+                'popular recipes',
+                Recipe.objects.order_by('-popularity', '-id')[:6]
+            ),
+            (
+                'trending recipes',
+                Recipe.objects.order_by('-trending', '-id')[:6]
+            ),
+            (
+                'recipes by cooking time',
+                Recipe.objects.order_by('cooking_time', '-id')[:6]
+            ),
+            (
+                'trending window',
+                Favourite.objects.filter(
+                    created__gte=user.date_joined
+                ).order_by()
+            ),
+            (
+                'recipes by tag',
+                Recipe.objects.filter(tags__slug__in=(tag.slug,))[:6]
+            ),
+            (
+                'recipes by ingredients',
+                filter_by_ingredients(Recipe.objects.all(), (ingredient.pk,))
+            ),
+            (
+                'recipe search',
+                search_recipes(Recipe.objects.all(), 'check')[:6]
+            ),
+            (
+                'favourited recipes',
+                Recipe.objects.filter(favourites__user=user)[:6]
+            ),
+            (
+                'recipes in shopping cart',
+                Recipe.objects.filter(shopping_carts__user=user)[:6]
+            ),
+            (
+                'shopping cart flag',
+                ShoppingCart.objects.filter(user=user, recipe__author=author)
+            ),
+            (
+                'subscriptions',
+                User.objects.filter(following__user=user)[:6]
+            ),
+            (
+                'shopping list',
+                ShoppingCartTotal.objects.ingredients_shopping_cart(user)
+            ),
+            (
+                'ingredients by name',
+                IngredientSearchFilter().get_name(
+                    Ingredient.objects.all(), 'name', ingredient.name
+                )
+            ),
+            (
+                'ingredient by name and unit',
+                Ingredient.objects.filter(
+                    name=ingredient.name,
+                    measurement_unit=ingredient.measurement_unit
+                )
+            ),
+            (
+                'recipe ingredients',
+                RecipeIngredient.objects.filter(
+                    recipe__author=author
+                ).select_related('ingredient')
+            ),
+        )
@@ -0,0 +1,97 @@
+import posixpath
+import re
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to.rstrip('/')
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp')
+VARIANT_NAME = re.compile(r'^(?P<stem>.+)_\d+w\.webp$')
+
+
+class Command(BaseCommand):
+    help = ('Поиск и удаление файлов картинок, '
+            'на которые не ссылается ни один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать найденные файлы, ничего не удалять.'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Повторять сборку каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.collect(options)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.walk(posixpath.join(directory, name))
+
+    def get_owners(self, name):
+        match = VARIANT_NAME.match(name)
+        if match is None:
+            return (name,)
+        return tuple(
+            f'{match["stem"]}.{extension}' for extension in IMAGE_EXTENSIONS
+        )
+
+    def collect(self, options):
+        threshold = timezone.now() - timedelta(seconds=options['min_age'])
+        scanned = orphans = 0
+        batch = []
+        for name in self.walk(IMAGES_DIR):
+            scanned += 1
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                orphans += self.collect_batch(batch, threshold, options)
+                batch = []
+        if batch:
+            orphans += self.collect_batch(batch, threshold, options)
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {scanned}. {action} лишних: {orphans}'
+        ))
+
+    def collect_batch(self, names, threshold, options):
+        owners = {name: self.get_owners(name) for name in names}
+        referenced = set(Recipe.objects.filter(image__in={
+            owner for candidates in owners.values() for owner in candidates
+        }).values_list('image', flat=True))
+        orphans = 0
+        for name, candidates in owners.items():
+            if referenced.intersection(candidates):
+                continue
+            if default_storage.get_modified_time(name) > threshold:
+                continue
+            orphans += 1
+            self.stdout.write(name)
+            if not options['dry_run']:
+                default_storage.delete(name)
+        return orphans
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий и WebP-вариантов картинок рецептов.'
+
+    def handle(self, *args, **kwargs):
+        names = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).exclude(image_variants=F('image')).values_list(
+            'image', flat=True
+        ).distinct()
+        created = 0
+        for name in names.iterator():
+            try:
+                generate_variants(name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+                continue
+            created += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано изображений: {created}')
+        )
@@ -0,0 +1,225 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_catalog_version
+from foodgram_backend.settings import IMPORT_FILES_DIR
+from recipes.models import Ingredient, Tag
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Модель, поля во входных данных и естественный ключ.
+CATALOGS = {
+    'ingredients': (
+        Ingredient, ('name', 'measurement_unit'), ('name', 'measurement_unit')
+    ),
+    'tags': (Tag, ('name', 'slug', 'color'), ('slug',)),
+}
+
+SYNTHETIC_UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.')
+
+
+def iter_csv(file, fields):
+    for row in csv.reader(file):
+        if not row or row == list(fields):
+            continue
+        if len(row) < len(fields):
+            raise CommandError(f'Неполная строка: {row}')
+        yield dict(zip(fields, row))
+
+
+def iter_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json(file):
+    """Читает JSON-массив объектов по частям, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    while True:
+        chunk = file.read(JSON_CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not opened:
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Некорректный JSON')
+                break
+            yield item
+        if not chunk:
+            if opened:
+                raise CommandError('Некорректный JSON')
+            return
+
+
+def iter_synthetic(catalog, total):
+    for number in range(total):
+        if catalog == 'tags':
+            yield {
+                'name': f'Тег {number}',
+                'slug': f'tag-{number}',
+                'color': f'#{number:06X}',
+            }
+        else:
+            yield {
+                'name': f'продукт {number}',
+                'measurement_unit': SYNTHETIC_UNITS[
+                    number % len(SYNTHETIC_UNITS)
+                ],
+            }
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка ингредиентов или тегов из csv, json или ndjson. '
+        'Повторный запуск не создаёт дубликатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=CATALOGS)
+        parser.add_argument(
+            'path', nargs='?',
+            help='Путь к файлу, по умолчанию data/<catalog>.<format>'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Обновлять существующие записи по естественному ключу'
+        )
+        parser.add_argument(
+            '--synthetic', type=int, metavar='N',
+            help='Вместо файла загрузить N сгенерированных записей'
+        )
+
+    def handle(self, *args, **options):
+        catalog = options['catalog']
+        model, fields, key = CATALOGS[catalog]
+        batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        if batch_size < 1:
+            raise CommandError('Размер пакета должен быть больше нуля')
+        before = model.objects.count()
+        started = time.monotonic()
+        if options['synthetic'] is not None:
+            processed = self.load(
+                iter_synthetic(catalog, options['synthetic']),
+                model, fields, key, batch_size, options['update']
+            )
+        else:
+            path, file_format = self.get_source(options)
+            with open(path, encoding='utf-8', newline='') as file:
+                if file_format == 'csv':
+                    rows = iter_csv(file, fields)
+                elif file_format == 'ndjson':
+                    rows = iter_ndjson(file)
+                else:
+                    rows = iter_json(file)
+                processed = self.load(
+                    rows, model, fields, key, batch_size, options['update']
+                )
+        elapsed = time.monotonic() - started
+        created = model.objects.count() - before
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные загружены: обработано {processed}, '
+            f'добавлено {created}, {elapsed:.1f} с, '
+            f'{processed / elapsed if elapsed else processed:.0f} строк/с'
+        ))
+
+    def get_source(self, options):
+        file_format = options['format']
+        path = options['path']
+        if path is None:
+            path = os.path.join(
+                IMPORT_FILES_DIR,
+                f'{options["catalog"]}.{file_format or "csv"}'
+            )
+        if file_format is None:
+            file_format = os.path.splitext(path)[1].lstrip('.').lower()
+            if file_format == 'jsonl':
+                file_format = 'ndjson'
+            if file_format not in FORMATS:
+                raise CommandError(
+                    f'Не удалось определить формат файла {path}'
+                )
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        return path, file_format
+
+    def load(self, rows, model, fields, key, batch_size, update):
+        processed = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return processed
+            try:
+                objects = [
+                    model(**{field: row[field] for field in fields})
+                    for row in batch
+                ]
+            except (KeyError, TypeError):
+                raise CommandError(
+                    f'Каждая запись должна содержать поля: {", ".join(fields)}'
+                )
+            with transaction.atomic():
+                if update:
+                    self.update_existing(objects, model, fields, key)
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+            processed += len(batch)
+            if self.verbosity > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{processed} строк, '
+                    f'{processed / elapsed if elapsed else processed:.0f} '
+                    'строк/с'
+                )
+
+    def update_existing(self, objects, model, fields, key):
+        changed = [field for field in fields if field not in key]
+        if not changed or len(key) != 1:
+            return
+        existing = model.objects.in_bulk(
+            [getattr(obj, key[0]) for obj in objects], field_name=key[0]
+        )
+        updated = {}
+        for obj in objects:
+            current = existing.get(getattr(obj, key[0]))
+            if current is None or all(
+                getattr(current, field) == getattr(obj, field)
+                for field in changed
+            ):
+                continue
+            for field in changed:
+                setattr(current, field, getattr(obj, field))
+            updated[current.pk] = current
+        model.objects.bulk_update(updated.values(), changed)
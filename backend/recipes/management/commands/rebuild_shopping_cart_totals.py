@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartTotal
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт итогов списков покупок по корзинам пользователей '
+            'или проверка их согласованности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить итоги с корзинами, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            return self.verify()
+        with transaction.atomic():
+            ShoppingCartTotal.objects.all().delete()
+            ShoppingCartTotal.objects.bulk_create(
+                (
+                    ShoppingCartTotal(
+                        user_id=row['recipe__shopping_carts__user'],
+                        ingredient_id=row['ingredient'],
+                        amount=row['total']
+                    )
+                    for row in ShoppingCartTotal.objects.live_totals(
+                    ).iterator()
+                ),
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(self.style.SUCCESS('Итоги пересчитаны'))
+
+    def verify(self):
+        expected = {
+            (row['recipe__shopping_carts__user'], row['ingredient']):
+            row['total']
+            for row in ShoppingCartTotal.objects.live_totals().iterator()
+        }
+        mismatches = 0
+        for user, ingredient, amount in ShoppingCartTotal.objects.values_list(
+            'user', 'ingredient', 'amount'
+        ).iterator():
+            if expected.pop((user, ingredient), None) != amount:
+                mismatches += 1
+        mismatches += len(expected)
+        if mismatches:
+            raise CommandError(f'Расхождений в итогах: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Итоги согласованы'))
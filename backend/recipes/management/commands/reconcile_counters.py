@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт счётчиков избранного, рецептов и подписок '
+            'или проверка их согласованности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только найти расхождения, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_counters(fix=not options['verify'])
+        for name, count in drift.items():
+            self.stdout.write(f'{name}: {count}')
+        if options['verify'] and any(drift.values()):
+            raise CommandError('Счётчики расходятся с данными')
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики согласованы' if options['verify']
+            else 'Счётчики пересчитаны'
+        ))
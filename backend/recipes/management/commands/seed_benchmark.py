@@ -0,0 +1,203 @@
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import reset_recipe_ingredients_version
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscribe,
+    Tag,
+    User
+)
+
+PREFIX = 'bench'
+EMAIL_DOMAIN = '@foodgram.local'
+PASSWORD = 'bench-password'
+
+
+def get_bench_users():
+    """Только сгенерированные пользователи, а не все с префиксом bench."""
+    return User.objects.filter(
+        username__regex=rf'^{PREFIX}[0-9]+$', email__endswith=EMAIL_DOMAIN
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация тестовых пользователей, рецептов, подписок, избранного '
+        'и корзин для нагрузочного тестирования. Популярность авторов, '
+        'рецептов и продуктов распределена по закону Ципфа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Среднее число продуктов в рецепте'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--favourites', type=int, default=20,
+            help='Среднее число рецептов в избранном'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в корзине'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить данные предыдущего запуска'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        started = time.monotonic()
+        if options['clear']:
+            get_bench_users().delete()
+        elif get_bench_users().exists():
+            raise CommandError(
+                'Тестовые данные уже созданы, используйте --clear'
+            )
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredients:
+            raise CommandError(
+                'Справочник продуктов пуст, загрузите его командой '
+                'load_catalog'
+            )
+        tags = list(Tag.objects.values_list('id', flat=True))
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(users, options['recipes'])
+            self.create_recipe_relations(
+                recipes, ingredients, tags, options['ingredients']
+            )
+            self.create_user_relations(users, recipes, options)
+        call_command('rebuild_shopping_cart_totals', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('update_recipe_scores', stdout=self.stdout)
+        reset_recipe_ingredients_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, рецептов {len(recipes)} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
+
+    def bulk_create(self, model, objects):
+        objects = iter(objects)
+        created = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+        if self.verbosity > 1:
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {created}')
+
+    def skewed(self, items):
+        """Выбор с весом 1 / rank ** skew: первые элементы популярнее."""
+        items = list(items)
+        self.random.shuffle(items)
+        weights = list(accumulate(
+            1 / rank ** self.skew for rank in range(1, len(items) + 1)
+        ))
+
+        def choose(count):
+            return set(self.random.choices(
+                items, cum_weights=weights, k=count
+            ))
+        return choose
+
+    def spread(self, average):
+        return self.random.randint(0, average * 2)
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        self.bulk_create(User, (
+            User(
+                email=f'{PREFIX}{index}{EMAIL_DOMAIN}',
+                username=f'{PREFIX}{index}',
+                first_name='Bench',
+                last_name=str(index),
+                password=password
+            )
+            for index in range(count)
+        ))
+        return list(get_bench_users().values_list('id', flat=True))
+
+    def create_recipes(self, users, count):
+        authors = self.skewed(users)
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=authors(1).pop(),
+                name=f'{PREFIX} recipe {index}',
+                text='Рецепт для нагрузочного тестирования',
+                cooking_time=self.random.randint(1, 180),
+                image='recipes/images/bench.png'
+            )
+            for index in range(count)
+        ))
+        return list(Recipe.objects.filter(
+            author__in=get_bench_users()
+        ).values_list('id', flat=True))
+
+    def create_recipe_relations(self, recipes, ingredients, tags, average):
+        ingredient_choice = self.skewed(ingredients)
+        self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe,
+                ingredient_id=ingredient,
+                amount=self.random.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient in ingredient_choice(max(1, self.spread(average)))
+        ))
+        if tags:
+            self.bulk_create(Recipe.tags.through, (
+                Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, len(tags))
+                )
+            ))
+
+    def create_user_relations(self, users, recipes, options):
+        author_choice = self.skewed(users)
+        recipe_choice = self.skewed(recipes)
+        self.bulk_create(Subscribe, (
+            Subscribe(user_id=user, author_id=author)
+            for user in users
+            for author in author_choice(self.spread(options['subscriptions']))
+            if author != user
+        ))
+        self.bulk_create(Favourite, (
+            Favourite(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in recipe_choice(self.spread(options['favourites']))
+        ))
+        self.bulk_create(ShoppingCart, (
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in recipe_choice(self.spread(options['carts']))
+        ))
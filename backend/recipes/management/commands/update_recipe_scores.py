@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.scores import update_popularity, update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт оценок популярности рецептов для сортировок popular '
+        'и trending. Запускается периодически, например раз в час.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        popularity = update_popularity()
+        trending = update_trending(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность обновлена у {popularity} рецептов, '
+            f'тренды — у {trending} за {time.monotonic() - started:.1f} с'
+        ))
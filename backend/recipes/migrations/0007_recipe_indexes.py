@@ -0,0 +1,87 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:45
+
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.functions.text
+
+
+def delete_shopping_cart_duplicates(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    duplicates = ShoppingCart.objects.exclude(
+        pk__in=ShoppingCart.objects.values('user', 'recipe').annotate(
+            first=models.Min('pk')
+        ).values('first')
+    )
+    users = set(duplicates.values_list('user', flat=True))
+    if not users:
+        return
+    duplicates.delete()
+    # Итоги из 0006 посчитаны с дубликатами, пересчитываем их.
+    ShoppingCartTotal.objects.filter(user__in=users).delete()
+    ShoppingCartTotal.objects.bulk_create(
+        (
+            ShoppingCartTotal(
+                user_id=row['recipe__shopping_carts__user'],
+                ingredient_id=row['ingredient'],
+                amount=row['total']
+            )
+            for row in RecipeIngredient.objects.filter(
+                recipe__shopping_carts__user__in=users
+            ).values(
+                'recipe__shopping_carts__user', 'ingredient'
+            ).order_by().annotate(total=models.Sum('amount')).iterator()
+        ),
+        batch_size=1000
+    )
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+        'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_shoppingcarttotal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='ingredient_lower_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            create_trigram_index, drop_trigram_index
+        ),
+        migrations.RunPython(
+            delete_shopping_cart_duplicates, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Изображение с готовыми вариантами'),
+        ),
+    ]
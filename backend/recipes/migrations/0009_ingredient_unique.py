@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:51
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).order_by().annotate(
+        keep=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1)
+    for row in duplicates.iterator():
+        extra = Ingredient.objects.filter(
+            name=row['name'], measurement_unit=row['measurement_unit']
+        ).exclude(id=row['keep'])
+        RecipeIngredient.objects.filter(ingredient__in=extra).update(
+            ingredient_id=row['keep']
+        )
+        for total in ShoppingCartTotal.objects.filter(ingredient__in=extra):
+            kept, created = ShoppingCartTotal.objects.get_or_create(
+                user_id=total.user_id,
+                ingredient_id=row['keep'],
+                defaults={'amount': total.amount}
+            )
+            if not created:
+                kept.amount += total.amount
+                kept.save(update_fields=['amount'])
+            total.delete()
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
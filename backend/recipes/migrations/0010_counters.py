@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:02
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('recipes', 'User')
+    Favourite = apps.get_model('recipes', 'Favourite')
+    Subscribe = apps.get_model('recipes', 'Subscribe')
+    for model, field, related_model, related_field in (
+        (Recipe, 'favorites_count', Favourite, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', Subscribe, 'author'),
+        (User, 'subscriptions_count', Subscribe, 'user'),
+    ):
+        model.objects.update(**{field: Coalesce(models.Subquery(
+            related_model.objects.filter(
+                **{related_field: models.OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                total=models.Count('pk')
+            ).values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчики'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецепты'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscriptions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписки'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('neighbours', models.JSONField(default=list, help_text='Пары [id рецепта, сходство] по убыванию сходства', verbose_name='Похожие рецепты')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Похожие рецепты',
+                'verbose_name_plural': 'Похожие рецепты',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityQueue',
+            fields=[
+                ('recipe_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Рецепт для пересчёта похожих',
+                'verbose_name_plural': 'Рецепты для пересчёта похожих',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_created(apps, schema_editor):
+    # Точное время добавления неизвестно, берём дату публикации рецепта,
+    # чтобы старые записи не попали в «тренды».
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for name in ('Favourite', 'ShoppingCart'):
+        apps.get_model('recipes', name).objects.update(
+            created=models.Subquery(
+                Recipe.objects.filter(
+                    pk=models.OuterRef('recipe_id')
+                ).values('pub_date')
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favourite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последние дни'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-id'], name='recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_lower_name_idx',
+        ),
+    ]
@@ -1,7 +1,7 @@
 from colorfield.fields import ColorField
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
 from recipes.validators import validate_username
 
@@ -10,7 +10,22 @@ MAX_LENGTH = 150
 MIN_VALUE_VALID = 1
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики и оценки, обновляемые в обход save()."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     USER = 'user'
     ADMIN = 'admin'
 
@@ -21,6 +36,11 @@ class User(AbstractUser):
         'last_name',
         'password'
     )
+    counter_fields = (
+        'recipes_count',
+        'followers_count',
+        'subscriptions_count'
+    )
 
     email = models.EmailField(
         'Email',
@@ -45,6 +65,21 @@ class User(AbstractUser):
         'Пароль',
         max_length=MAX_LENGTH
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецепты',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчики',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        'Подписки',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -62,6 +97,12 @@ class Ingredient(models.Model):
     class Meta():
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -83,7 +124,9 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'popularity', 'trending')
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -103,6 +146,13 @@ class Recipe(models.Model):
         null=True,
         default=None
     )
+    image_variants = models.CharField(
+        'Изображение с готовыми вариантами',
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False
+    )
     text = models.TextField(
         'Текстовое описание',
         help_text='Напишите описание рецепта')
@@ -128,11 +178,43 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
+    trending = models.FloatField(
+        'Популярность за последние дни',
+        default=0,
+        editable=False
+    )
 
     class Meta():
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(fields=('-pub_date',), name='recipe_pub_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-popularity', '-id'), name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=('-trending', '-id'), name='recipe_trending_idx'
+            ),
+            models.Index(
+                fields=('cooking_time', '-id'),
+                name='recipe_cooking_time_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -161,6 +243,12 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Продукт в рецепте'
         verbose_name_plural = 'Продукты в рецепте'
+        indexes = [
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipe_ingredient_lookup_idx'
+            ),
+        ]
 
     def ingredients_shopping_cart(self, request):
         return RecipeIngredient.objects.filter(
@@ -220,6 +308,11 @@ class UserRecipeModel(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        'Добавлено',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -244,7 +337,7 @@ class Favourite(UserRecipeModel):
     def __str__(self):
         return self.FAVOURITE_PHRASE.format(
             user=self.user.username,
-            author=self.recipe.name
+            recipe=self.recipe.name
         )
 
 
@@ -256,9 +349,142 @@ class ShoppingCart(UserRecipeModel):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         default_related_name = 'shopping_carts'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_shopping_cart'
+            )
+        ]
 
     def __str__(self):
         return self.FAVOURITE_PHRASE.format(
             user=self.user.username,
-            author=self.recipe.name
+            recipe=self.recipe.name
         )
+
+
+class ShoppingCartTotalManager(models.Manager):
+
+    def apply_deltas(self, users, deltas):
+        deltas = {
+            ingredient: delta for ingredient, delta in deltas.items() if delta
+        }
+        users = set(users)
+        if not users or not deltas:
+            return
+        with transaction.atomic():
+            existing = set()
+            to_update = []
+            to_delete = []
+            for cart_total in self.select_for_update().filter(
+                user__in=users,
+                ingredient__in=deltas
+            ):
+                existing.add((cart_total.user_id, cart_total.ingredient_id))
+                cart_total.amount += deltas[cart_total.ingredient_id]
+                if cart_total.amount > 0:
+                    to_update.append(cart_total)
+                else:
+                    to_delete.append(cart_total.pk)
+            self.bulk_update(to_update, ('amount',))
+            self.filter(pk__in=to_delete).delete()
+            self.bulk_create(
+                self.model(
+                    user_id=user, ingredient_id=ingredient, amount=delta
+                )
+                for user in users
+                for ingredient, delta in deltas.items()
+                if delta > 0 and (user, ingredient) not in existing
+            )
+
+    def add_recipe(self, user_id, recipe_id, sign=1):
+        deltas = {}
+        for ingredient, amount in RecipeIngredient.objects.filter(
+            recipe=recipe_id
+        ).values_list('ingredient', 'amount'):
+            deltas[ingredient] = deltas.get(ingredient, 0) + sign * amount
+        self.apply_deltas((user_id,), deltas)
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.add_recipe(user_id, recipe_id, sign=-1)
+
+    def live_totals(self):
+        return RecipeIngredient.objects.filter(
+            recipe__shopping_carts__isnull=False
+        ).values(
+            'recipe__shopping_carts__user',
+            'ingredient'
+        ).order_by().annotate(total=models.Sum('amount'))
+
+    def ingredients_shopping_cart(self, user):
+        return self.filter(user=user).values(
+            'ingredient__name',
+            'ingredient__measurement_unit'
+        ).order_by('ingredient__name').annotate(total=models.Sum('amount'))
+
+
+class ShoppingCartTotal(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name='Продукт'
+    )
+    amount = models.PositiveIntegerField('Итоговое количество')
+
+    objects = ShoppingCartTotalManager()
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_total'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username}: {self.ingredient} - {self.amount}'
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similarity',
+        verbose_name='Рецепт'
+    )
+    neighbours = models.JSONField(
+        'Похожие рецепты',
+        default=list,
+        help_text='Пары [id рецепта, сходство] по убыванию сходства'
+    )
+    updated = models.DateTimeField('Пересчитано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Похожие рецепты'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {len(self.neighbours)}'
+
+
+class SimilarityQueue(models.Model):
+    # Без внешнего ключа: рецепт может попасть в очередь при каскадном
+    # удалении, когда его строки уже нет.
+    recipe_id = models.BigIntegerField('Рецепт', primary_key=True)
+
+    class Meta:
+        verbose_name = 'Рецепт для пересчёта похожих'
+        verbose_name_plural = 'Рецепты для пересчёта похожих'
+
+    def __str__(self):
+        return str(self.recipe_id)
@@ -0,0 +1,187 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeIngredient,
+    RecipeSimilarity,
+    SimilarityQueue
+)
+
+TOP_K = 20
+# Сколько кандидатов с наибольшим числом общих признаков оценивать.
+CANDIDATES = 100
+# Избранное пользователя, учитываемое при подсчёте совместного избранного.
+MAX_USER_FAVOURITES = 200
+# Продукты из большего числа рецептов (соль, вода) не говорят о сходстве.
+MAX_INGREDIENT_RECIPES = 500
+FAVOURITE_WEIGHT = 0.6
+INGREDIENT_WEIGHT = 0.3
+TAG_WEIGHT = 0.1
+
+# Вес связи пользователя с рецептом при подборе рекомендаций.
+SEED_WEIGHTS = {'favourites': 1.0, 'cart': 0.5}
+MAX_SEEDS = 100
+FOLLOWING_BONUS = 0.2
+
+EMPTY = frozenset()
+
+
+def queue_recipes(recipe_ids):
+    SimilarityQueue.objects.bulk_create(
+        (SimilarityQueue(recipe_id=recipe_id) for recipe_id in recipe_ids),
+        ignore_conflicts=True
+    )
+
+
+def jaccard(first, second, common):
+    union = len(first) + len(second) - common
+    return common / union if union else 0.0
+
+
+class SimilarityModel:
+    """Разреженные признаки рецептов и их попарное сходство.
+
+    Признаки рецепта — пользователи, добавившие его в избранное,
+    «редкие» продукты и теги. Сходство — взвешенная сумма косинуса по
+    совместному избранному и коэффициентов Жаккара по продуктам и тегам.
+    Строка матрицы сходства считается через обратные индексы, так что
+    перебираются только рецепты с общими признаками.
+    """
+
+    def __init__(self):
+        self.fans = defaultdict(set)
+        self.favourites = defaultdict(list)
+        self.ingredients = defaultdict(set)
+        self.ingredient_recipes = defaultdict(set)
+        self.tags = {}
+
+    def load(self):
+        for user_id, recipe_id in Favourite.objects.order_by(
+            'user_id', '-id'
+        ).values_list('user_id', 'recipe_id').iterator():
+            favourites = self.favourites[user_id]
+            if len(favourites) < MAX_USER_FAVOURITES:
+                favourites.append(recipe_id)
+                self.fans[recipe_id].add(user_id)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            self.ingredient_recipes[ingredient_id].add(recipe_id)
+        for ingredient_id, recipes in list(self.ingredient_recipes.items()):
+            if len(recipes) > MAX_INGREDIENT_RECIPES:
+                del self.ingredient_recipes[ingredient_id]
+                continue
+            for recipe_id in recipes:
+                self.ingredients[recipe_id].add(ingredient_id)
+        tags = defaultdict(set)
+        for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ).iterator():
+            tags[recipe_id].add(tag_id)
+        self.tags.update(
+            (recipe_id, frozenset(ids)) for recipe_id, ids in tags.items()
+        )
+        return self
+
+    def neighbours(self, recipe_id, top_k=TOP_K):
+        fans = self.fans.get(recipe_id, ())
+        common_fans = Counter()
+        for user_id in fans:
+            common_fans.update(self.favourites[user_id])
+        ingredients = self.ingredients.get(recipe_id, ())
+        common_ingredients = Counter()
+        for ingredient_id in ingredients:
+            common_ingredients.update(self.ingredient_recipes[ingredient_id])
+        candidates = {
+            candidate
+            for counter in (common_fans, common_ingredients)
+            for candidate, _ in counter.most_common(CANDIDATES + 1)
+        }
+        candidates.discard(recipe_id)
+        tags = self.tags.get(recipe_id, EMPTY)
+        scored = []
+        for candidate in candidates:
+            score = INGREDIENT_WEIGHT * jaccard(
+                ingredients, self.ingredients.get(candidate, ()),
+                common_ingredients[candidate]
+            )
+            if common_fans[candidate]:
+                score += FAVOURITE_WEIGHT * common_fans[candidate] / math.sqrt(
+                    len(fans) * len(self.fans[candidate])
+                )
+            candidate_tags = self.tags.get(candidate, EMPTY)
+            score += TAG_WEIGHT * jaccard(
+                tags, candidate_tags, len(tags & candidate_tags)
+            )
+            scored.append((round(score, 4), candidate))
+        return [
+            [candidate, score]
+            for score, candidate in heapq.nlargest(top_k, scored)
+            if score > 0
+        ]
+
+
+def build_similarities(recipe_ids=None, batch_size=1000, top_k=TOP_K):
+    """Пересчёт похожих рецептов: всех или только перечисленных."""
+    model = SimilarityModel().load()
+    if recipe_ids is None:
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    total = 0
+    recipe_ids = iter(recipe_ids)
+    while True:
+        batch = list(islice(recipe_ids, batch_size))
+        if not batch:
+            return total
+        existing = set(
+            Recipe.objects.filter(pk__in=batch).values_list('id', flat=True)
+        )
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=batch).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe_id,
+                    neighbours=model.neighbours(recipe_id, top_k)
+                )
+                for recipe_id in batch if recipe_id in existing
+            )
+        total += len(existing)
+
+
+def take_queue():
+    with transaction.atomic():
+        recipe_ids = list(
+            SimilarityQueue.objects.values_list('recipe_id', flat=True)
+        )
+        SimilarityQueue.objects.filter(recipe_id__in=recipe_ids).delete()
+    return recipe_ids
+
+
+def recommend(relations, following_recipes, limit):
+    """Id рекомендованных рецептов по убыванию оценки.
+
+    relations — избранное и корзина пользователя, following_recipes —
+    свежие рецепты авторов из его подписок.
+    """
+    weights = {}
+    for name, weight in SEED_WEIGHTS.items():
+        for recipe_id in getattr(relations, name):
+            weights[recipe_id] = max(weight, weights.get(recipe_id, 0))
+    # Самые новые рецепты из избранного и корзины.
+    seed_ids = heapq.nlargest(MAX_SEEDS, weights)
+    scores = Counter()
+    for recipe_id, neighbours in RecipeSimilarity.objects.filter(
+        recipe_id__in=seed_ids
+    ).values_list('recipe_id', 'neighbours'):
+        for neighbour, similarity in neighbours:
+            scores[neighbour] += weights[recipe_id] * similarity
+    for recipe_id in following_recipes:
+        scores[recipe_id] += FOLLOWING_BONUS
+    for recipe_id in weights:
+        scores.pop(recipe_id, None)
+    return [recipe_id for recipe_id, _ in scores.most_common(limit)]
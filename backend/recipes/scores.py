@@ -0,0 +1,72 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.counters import get_actual_count
+from recipes.models import Favourite, Recipe, ShoppingCart
+
+# Вклад добавления рецепта в корзину относительно добавления в избранное.
+CART_WEIGHT = 0.5
+TRENDING_HALF_LIFE = timedelta(days=3)
+# За пределами окна вклад меньше тысячной доли, его не учитываем.
+TRENDING_WINDOW = TRENDING_HALF_LIFE * 10
+
+
+def get_popularity():
+    return F('favorites_count') + CART_WEIGHT * get_actual_count(
+        ShoppingCart, 'recipe'
+    )
+
+
+def update_popularity():
+    """Популярность за всё время; обновляются только изменившиеся строки."""
+    return Recipe.objects.exclude(popularity=get_popularity()).update(
+        popularity=get_popularity()
+    )
+
+
+def get_trending_scores(now):
+    scores = {}
+    for weight, rows in (
+        (1.0, Favourite.objects.filter(created__gte=now - TRENDING_WINDOW)),
+        (CART_WEIGHT, ShoppingCart.objects.filter(
+            created__gte=now - TRENDING_WINDOW
+        )),
+    ):
+        for recipe_id, created in rows.order_by().values_list(
+            'recipe_id', 'created'
+        ).iterator():
+            scores[recipe_id] = scores.get(recipe_id, 0) + weight * 0.5 ** (
+                (now - created) / TRENDING_HALF_LIFE
+            )
+    return scores
+
+
+def update_trending(now=None, batch_size=1000):
+    """Сумма добавлений в избранное и корзину с экспоненциальным затуханием.
+
+    Пересчитываются рецепты с добавлениями в окне TRENDING_WINDOW,
+    у остальных ненулевая оценка сбрасывается.
+    """
+    scores = get_trending_scores(now or timezone.now())
+    scores.update(
+        (recipe_id, 0) for recipe_id in Recipe.objects.filter(
+            trending__gt=0
+        ).values_list('id', flat=True) if recipe_id not in scores
+    )
+    recipes = iter(scores.items())
+    while True:
+        batch = list(islice(recipes, batch_size))
+        if not batch:
+            return len(scores)
+        with transaction.atomic():
+            Recipe.objects.bulk_update(
+                [
+                    Recipe(pk=recipe_id, trending=round(score, 6))
+                    for recipe_id, score in batch
+                ],
+                ('trending',)
+            )
@@ -0,0 +1,105 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+SEARCH_TERM = re.compile(r'\w+')
+
+MATCH_SQL = {
+    'postgresql': (
+        'SELECT id FROM recipes_recipe '
+        'WHERE search_vector @@ websearch_to_tsquery(%s::regconfig, %s)'
+    ),
+    'sqlite': f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+}
+RANK_SQL = {
+    'postgresql': (
+        'ts_rank(recipes_recipe.search_vector, '
+        'websearch_to_tsquery(%s::regconfig, %s))'
+    ),
+    # rank в FTS5 — bm25, у которого меньше значит релевантнее.
+    'sqlite': (
+        f'SELECT -rank FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id'
+    ),
+}
+
+# Во внешней таблице FTS5 индекс обновляют триггеры. SQLite удаляет их
+# при пересоздании recipes_recipe в миграциях, поэтому они создаются
+# заново после каждого migrate, см. create_sqlite_search_index.
+SQLITE_SEARCH_INDEX = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, text, content='recipes_recipe', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+    f"VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+    f'AFTER INSERT ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    f'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+    f'AFTER DELETE ON recipes_recipe BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+    f'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    f'VALUES (new.id, new.name, new.text); END',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+def create_sqlite_search_index(using):
+    with connections[using].cursor() as cursor:
+        for sql in SQLITE_SEARCH_INDEX:
+            cursor.execute(sql)
+
+
+def get_search_params(value):
+    if connection.vendor == 'postgresql':
+        return (SEARCH_CONFIG, value)
+    # Каждое слово — префикс, все слова обязательны.
+    return (' '.join(
+        f'"{term}"*' for term in SEARCH_TERM.findall(value.lower())
+    ),)
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под запрос, с оценкой релевантности search_rank.
+
+    Поиск идёт по названию и описанию; название весит больше.
+    """
+    if connection.vendor not in MATCH_SQL:
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        )
+    params = get_search_params(value)
+    if not any(params):
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(MATCH_SQL[connection.vendor], params)
+    ).annotate(
+        search_rank=RawSQL(
+            RANK_SQL[connection.vendor], params, output_field=FloatField()
+        )
+    ).order_by('-search_rank', '-pub_date')
+
+
+def filter_by_ingredients(queryset, ingredient_ids):
+    """Рецепты, в которых есть все перечисленные продукты.
+
+    Запрос читает только индекс recipe_ingredient_lookup_idx.
+    """
+    ingredient_ids = set(ingredient_ids)
+    return queryset.filter(pk__in=RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).order_by().values('recipe_id').annotate(
+        found=Count('ingredient_id', distinct=True)
+    ).filter(found=len(ingredient_ids)).values('recipe_id'))
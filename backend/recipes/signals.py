@@ -0,0 +1,117 @@
+from django.db import connections, transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from recipes.counters import change_counter
+from recipes.images import schedule_variants
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartTotal,
+    Subscribe,
+    User
+)
+from recipes.recommendations import queue_recipes
+from recipes.search import create_sqlite_search_index
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_variants(sender, instance, **kwargs):
+    name = instance.image.name if instance.image else ''
+    if name and instance.image_variants != name:
+        transaction.on_commit(lambda: schedule_variants(name))
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def remember_shopping_cart_pair(sender, instance, **kwargs):
+    instance._saved_pair = None
+    if instance.pk is not None:
+        instance._saved_pair = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('user_id', 'recipe_id').first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_cart_total(sender, instance, created, **kwargs):
+    pair = (instance.user_id, instance.recipe_id)
+    saved_pair = instance.__dict__.pop('_saved_pair', None)
+    if not created and saved_pair == pair:
+        return
+    if saved_pair is not None:
+        ShoppingCartTotal.objects.remove_recipe(*saved_pair)
+    ShoppingCartTotal.objects.add_recipe(*pair)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_cart_total(sender, instance, **kwargs):
+    ShoppingCartTotal.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+def update_counters(sender, instance, delta):
+    if sender is Favourite:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', delta)
+    elif sender is Subscribe:
+        change_counter(User, instance.author_id, 'followers_count', delta)
+        change_counter(User, instance.user_id, 'subscriptions_count', delta)
+    else:
+        change_counter(User, instance.author_id, 'recipes_count', delta)
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=Subscribe)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, **kwargs):
+    if created:
+        update_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=Subscribe)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(sender, instance, -1)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using, **kwargs):
+    if sender.name == 'recipes' and connections[using].vendor == 'sqlite':
+        create_sqlite_search_index(using)
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=Recipe)
+def queue_created_for_similarity(sender, instance, created, **kwargs):
+    if created:
+        queue_recipes((
+            instance.pk if sender is Recipe else instance.recipe_id,
+        ))
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def queue_changed_for_similarity(sender, instance, **kwargs):
+    queue_recipes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def queue_tagged_for_similarity(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if reverse and action == 'pre_clear':
+        queue_recipes(instance.recipes.values_list('id', flat=True))
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        queue_recipes((instance.pk,))
+    elif pk_set:
+        queue_recipes(pk_set)
@@ -0,0 +1,37 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_HASH_NAME = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def is_content_addressed(self, name):
+        return CONTENT_HASH_NAME.search(name) is not None
+
+    def generate_filename(self, filename):
+        filename = super().generate_filename(filename)
+        dirname, basename = posixpath.split(filename)
+        digest = basename
+        if not self.is_content_addressed(basename):
+            digest = hashlib.md5(basename.encode()).hexdigest()
+        shards = (
+            digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+            for level in range(SHARD_LEVELS)
+        )
+        return posixpath.join(dirname, *shards, basename)
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if self.is_content_addressed(name) and self.exists(name):
+            return name
+        return super()._save(name, content)